@@ -1,14 +1,165 @@
 import asyncio
+import hashlib
 import json
-from typing import Dict, Any, List
-from pydantic import BaseModel, Field
+import math
+import re
+import string
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterator, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, model_serializer
 from enum import Enum
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from browser_use.browser.views import CurrentPageState
 from browser_use.agent.views import AgentOutput, AgentHistory, ActionModel, ActionResult
 from browser_agent.llm_service import LLMService
 from browser_use.memory.views import Memory
-from browser_agent.browser_use_adapter import BrowserUseAdapter
+from browser_agent.browser_use_adapter import BrowserUseAdapter, BrowserActionResult, BROWSER_ERRORS, action_failure
+
+
+# Clock-like substrings change on every render without changing the page
+_VOLATILE_TIME = re.compile(r"\d{2}:\d{2}:\d{2}")
+
+
+def _fingerprint(kind: str, task: str, *parts: Any) -> bytes:
+    """
+    Stable digest of a prompt's inputs, used as a memoization key
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (kind, task, *parts):
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str)
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+# Fields of a streamed action that are enough to start navigating early
+_STREAMED_ACTION = re.compile(r'"action"\s*:\s*"(\w+)"')
+_STREAMED_URL = re.compile(r'"url"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+# Page lines that describe something the agent can act on
+_INTERACTIVE_LINE = re.compile(
+    r"id=|name=|role=|aria-|href=|<a\b|<button\b|<input\b|\[(?:link|button)\]",
+    re.IGNORECASE
+)
+
+
+def _compact_content(content: str, budget: int = 2000) -> str:
+    """
+    Shrink page content for a prompt: collapse whitespace and, if still over
+    budget, keep only lines describing interactive elements, then truncate
+    """
+    lines = [" ".join(line.split()) for line in content.splitlines()]
+    compact = "\n".join(line for line in lines if line)
+    if len(compact) <= budget:
+        return compact
+    
+    interactive = [line for line in lines if _INTERACTIVE_LINE.search(line)]
+    if interactive:
+        compact = "\n".join(interactive)
+    if len(compact) > budget:
+        compact = compact[:budget] + "...[truncated]"
+    return compact
+
+
+def _action_signature(action: ActionModel) -> tuple:
+    """Action name plus JSON-stable parameters"""
+    return action.action, json.dumps(action.parameters, sort_keys=True, default=str)
+
+
+# Number of renders of a prompt for one task before it gets a specialized builder
+HOT_THRESHOLD = 5
+
+REASONING_PROMPT = """
+You are a browser automation agent. Your task is: {task}
+
+Current page state:
+- URL: {url}
+- Title: {title}
+- Content: {content}
+
+Available actions:
+- click(element_id): Click on an element with the given ID
+- type(element_id, text): Type text into an element with the given ID
+- scroll(direction): Scroll up/down
+- goto(url): Navigate to a URL
+- wait(seconds): Wait for specified seconds
+- stop: Stop the task execution
+
+Please provide the next action to take in JSON format:
+{{
+    "action": "...",
+    "parameters": {{}}
+}}
+"""
+
+REFLECTION_PROMPT = """
+Task: {task}
+Action taken: {action} with parameters {parameters}
+Execution result: {result}
+Current page state: {page}
+
+Was this action appropriate for the task? Did it succeed? What should be done next?
+
+Return in JSON format:
+{{
+    "is_correct": true/false,
+    "feedback": "explanation of what happened and what should be done",
+    "suggested_next_action": "what action to take next"
+}}
+"""
+
+CORRECTION_PROMPT = """
+Task: {task}
+Failed action: {action} with parameters {parameters}
+Execution result: {result}
+Feedback: {feedback}
+
+Based on the feedback, what should be the correct action to take?
+
+Return in JSON format:
+{{
+    "action": "...",
+    "parameters": {{}}
+}}
+"""
+
+
+def _specialize_prompt(template: str, **fixed: str) -> Callable[..., str]:
+    """
+    Generate a builder for the template with the fixed fields baked in.
+    The builder only concatenates precomputed static chunks around the
+    remaining fields, which it takes as keyword arguments.
+    """
+    chunks = [""]
+    slots = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        chunks[-1] += literal
+        if field is None:
+            continue
+        if field in fixed:
+            chunks[-1] += fixed[field]
+        else:
+            slots.append(field)
+            chunks.append("")
+    
+    body = " + ".join(
+        [repr(chunks[0])] + [f"{slot} + {chunk!r}" for slot, chunk in zip(slots, chunks[1:])]
+    )
+    src = f"def build({', '.join(dict.fromkeys(slots))}):\n    return {body}\n"
+    namespace: Dict[str, Any] = {}
+    exec(src, namespace)
+    return namespace["build"]
+
+
+# Agent-side models are built once and only read afterwards
+_FROZEN_MODEL = ConfigDict(frozen=True, arbitrary_types_allowed=True, validate_assignment=False)
 
 
 class Action(Enum):
@@ -23,6 +174,8 @@ class Action(Enum):
 
 class AgentState(BaseModel):
     """Current state of the agent"""
+    model_config = _FROZEN_MODEL
+    
     page_state: CurrentPageState
     memory: Memory
     history: AgentHistory
@@ -30,113 +183,381 @@ class AgentState(BaseModel):
 
 class ActionStep(BaseModel):
     """A single action step in the agent's plan"""
+    model_config = _FROZEN_MODEL
+    
     action: Action
     parameters: Dict[str, Any]
     description: str
 
 
+class RingHistory(AgentHistory):
+    """
+    Fixed-capacity agent history stored as parallel arrays.
+    Once full, each new step overwrites the oldest one; reserve() grows
+    the capacity when a run is known to need more steps.
+    
+    Steps live outside AgentHistory's fields, so pydantic serializes it
+    through as_history(); results hold that plain copy, since a field typed
+    AgentHistory is serialized with AgentHistory's own schema.
+    """
+    
+    _capacity: int
+    _action: List[Any]
+    _success: bytearray
+    _result: List[Optional[str]]
+    _n: int
+    
+    def __init__(self, max_steps: int):
+        super().__init__()
+        self._allocate(max(1, max_steps))
+    
+    def _allocate(self, capacity: int):
+        """Start empty arrays for capacity steps"""
+        self._capacity = capacity
+        self._action = [None] * capacity
+        self._success = bytearray(capacity)
+        self._result = [None] * capacity
+        self._n = 0
+    
+    @property
+    def max_steps(self) -> int:
+        """Number of steps kept before the oldest is overwritten"""
+        return self._capacity
+    
+    def reserve(self, max_steps: int):
+        """Grow to hold at least max_steps steps, keeping recorded steps in order"""
+        if max_steps <= self._capacity:
+            return
+        kept = self.dump()
+        self._allocate(max_steps)
+        for entry in kept:
+            self.record(entry["action"], entry["success"], entry["result"])
+    
+    def record(self, action: ActionModel, success: bool, result: str):
+        """Record a step without building an ActionResult"""
+        slot = self._n % self._capacity
+        self._action[slot] = action
+        self._success[slot] = success
+        self._result[slot] = result
+        self._n += 1
+    
+    def add_step(self, action: Any, result: ActionResult):
+        """AgentHistory-compatible entry point"""
+        self.record(result.action, result.success, result.result)
+    
+    def dump(self) -> List[Dict[str, Any]]:
+        """Plain records from oldest to newest, read straight from the arrays"""
+        start = self._n - len(self)
+        return [
+            {
+                "action": self._action[n % self._capacity],
+                "success": bool(self._success[n % self._capacity]),
+                "result": self._result[n % self._capacity],
+            }
+            for n in range(start, self._n)
+        ]
+    
+    def as_history(self) -> AgentHistory:
+        """A plain AgentHistory holding the recorded steps from oldest to newest"""
+        history = AgentHistory()
+        for entry in self:
+            history.add_step(entry.action, entry)
+        return history
+    
+    @model_serializer
+    def _serialize(self) -> AgentHistory:
+        """Serialize as the equivalent plain AgentHistory"""
+        return self.as_history()
+    
+    def __len__(self) -> int:
+        return min(self._n, self._capacity)
+    
+    def __iter__(self) -> Iterator[ActionResult]:
+        """Materialize ActionResults from oldest to newest"""
+        start = self._n - len(self)
+        for n in range(start, self._n):
+            slot = n % self._capacity
+            yield ActionResult.model_construct(
+                action=self._action[slot],
+                success=bool(self._success[slot]),
+                result=self._result[slot]
+            )
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize pydantic models nested in agent output"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dump_output(output: AgentOutput) -> bytes:
+    """
+    Serialize an agent run's outcome and history to JSON bytes,
+    using orjson when it is installed
+    """
+    history = output.history
+    payload = {
+        "success": output.success,
+        "result": output.result,
+        "history": history.dump() if isinstance(history, RingHistory) else history,
+    }
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=_json_default,
+            option=orjson.OPT_SERIALIZE_DATACLASS | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(payload, default=_json_default, ensure_ascii=False).encode()
+
+
 class BrowserAgent:
     """
     ReAct (Reasoning + Acting) based browser automation agent
     """
     
-    def __init__(self, llm_service: LLMService, max_steps: int = 50, headless: bool = True):
+    REASON_CACHE_SIZE = 1024
+    # (template, task) pairs whose render counts and specialized builders are kept
+    PROMPT_CACHE_SIZE = 64
+    # Characters of page content included in a prompt
+    CONTENT_BUDGET = 2000
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        max_steps: int = 50,
+        headless: bool = True,
+        speculative_navigation: bool = False
+    ):
         self.llm_service = llm_service
+        # Stream reasoning responses and start goto actions before they finish
+        self.speculative_navigation = speculative_navigation
+        self._pending_navigation: Optional[tuple] = None
         self.browser = BrowserUseAdapter(headless=headless)
         self.max_steps = max_steps
-        self.history = AgentHistory()
+        self.history = RingHistory(max_steps)
+        self._reason_cache: "OrderedDict[bytes, Any]" = OrderedDict()
+        # Cache key, task and page of the most recent reasoning decision, dropped if it fails
+        self._last_reason: Optional[tuple] = None
+        self._prompt_call_count: "OrderedDict[tuple, int]" = OrderedDict()
+        self._prompt_hot: "OrderedDict[tuple, Callable[..., str]]" = OrderedDict()
         
     async def run_task(self, task: str) -> AgentOutput:
         """
         Main method to run a task in the browser
         """
         try:
-            # Initialize browser
-            await self.browser.start_session()
+            # Open a fresh context; the browser itself persists across tasks
+            await self.browser.begin_task()
             
             # Main loop - ReAct pattern (Reasoning + Acting)
+            current_state = None
             for step in range(self.max_steps):
-                # 1. Observe current page state
-                current_state = await self.browser.get_current_page_state()
+                # 1. Observe current page state, reusing the one the last action returned
+                if current_state is None:
+                    current_state = await self.browser.get_current_page_state()
                 
                 # 2. Reason about next action
                 action_result = await self._think_and_act(task, current_state)
                 
                 # 3. Execute action
-                execution_result = await self.browser.execute_action(action_result.action)
+                execution_result = await self._execute(action_result.action)
+                if not execution_result.success:
+                    self._forget_last_decision()
                 
                 # 4. Add to history
                 # Note: We need to adapt the result format to match expected types
-                self.history.add_step(action_result, ActionResult(
-                    action=action_result.action,
-                    success=execution_result.success,
-                    result=execution_result.result
-                ))
+                self.history.record(
+                    action_result.action,
+                    execution_result.success,
+                    execution_result.result
+                )
                 
                 # 5. Check if task is completed
                 if action_result.action.action == "stop":
                     break
+                
+                current_state = execution_result.page_state
                     
             return AgentOutput(
                 success=True,
                 result="Task completed successfully",
-                history=self.history
+                history=self.history.as_history()
             )
             
         except Exception as e:
             return AgentOutput(
                 success=False,
                 result=f"Error: {str(e)}",
-                history=self.history
+                history=self.history.as_history()
             )
         finally:
-            await self.browser.end_session()
+            self._cancel_pending_navigation()
+            await self.browser.end_task()
+    
+    async def shutdown(self):
+        """
+        Close the browser kept alive across run_task calls
+        """
+        await self.browser.shutdown()
     
     async def _think_and_act(self, task: str, current_state: CurrentPageState) -> ActionResult:
         """
         Use LLM to decide next action based on current state and task
         """
+        # An unchanged page yields the same prompt, so reuse the last decision
+        key = _fingerprint(
+            "reason",
+            task,
+            current_state.url,
+            current_state.title,
+            _VOLATILE_TIME.sub("", current_state.content)
+        )
+        self._last_reason = (key, task, current_state)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
         # Create prompt for LLM
         prompt = self._create_reasoning_prompt(task, current_state)
         
         # Get action from LLM
-        response = await self.llm_service.get_completion(
-            prompt,
-            response_format=ActionModel
-        )
+        if self.speculative_navigation:
+            response = await self._stream_action(prompt)
+        else:
+            response = await self.llm_service.get_completion(
+                prompt,
+                response_format=ActionModel,
+                response_adapter=_ACTION_ADAPTER
+            )
         
-        return ActionResult(
+        action_result = ActionResult.model_construct(
             action=response,
             success=True,
             result="Action planned successfully"
         )
+        self._cache_put(key, action_result)
+        return action_result
+
+    async def _stream_action(self, prompt: str) -> ActionModel:
+        """
+        Stream the next action from the LLM. As soon as the partial response
+        names a goto and its URL, navigation starts in the background; the
+        run loop picks that task up if the finished action matches.
+        """
+        buffer = ""
+        speculative = None
+        try:
+            async for delta in self.llm_service.get_completion_stream(prompt, json_mode=True):
+                buffer += delta
+                if speculative is not None:
+                    continue
+                action_match = _STREAMED_ACTION.search(buffer)
+                if action_match is None or action_match.group(1) != "goto":
+                    continue
+                url_match = _STREAMED_URL.search(buffer)
+                if url_match is not None:
+                    url = json.loads(f'"{url_match.group(1)}"')
+                    speculative = (url, asyncio.create_task(self.browser.execute_action(
+                        ActionModel(action="goto", parameters={"url": url})
+                    )))
+            response = _ACTION_ADAPTER.validate_json(buffer)
+        except BaseException:
+            if speculative is not None:
+                speculative[1].cancel()
+            raise
+        
+        if speculative is not None:
+            url, navigation = speculative
+            if response.action == "goto" and response.parameters.get("url") == url:
+                self._pending_navigation = (response, navigation)
+            else:
+                navigation.cancel()
+        return response
+
+    async def _execute(self, action: ActionModel) -> BrowserActionResult:
+        """
+        Execute an action, reusing a speculative navigation started for it
+        """
+        pending, self._pending_navigation = self._pending_navigation, None
+        if pending is not None:
+            planned, navigation = pending
+            if planned is action:
+                return await navigation
+            navigation.cancel()
+        return await self.browser.execute_action(action)
+
+    def _cancel_pending_navigation(self):
+        """Drop a speculative navigation that no step claimed"""
+        if self._pending_navigation is not None:
+            self._pending_navigation[1].cancel()
+            self._pending_navigation = None
+
+    def _cache_get(self, key: bytes) -> Optional[Any]:
+        """Look up a memoized LLM response, marking it as recently used"""
+        value = self._reason_cache.get(key)
+        if value is not None:
+            self._reason_cache.move_to_end(key)
+        return value
+
+    def _forget_last_decision(self):
+        """
+        Drop the last reasoning decision from the agent's and the LLM
+        service's caches. A failed action usually leaves the page unchanged,
+        so keeping it would replay the same failure instead of asking the
+        LLM again.
+        """
+        if self._last_reason is None:
+            return
+        key, task, current_state = self._last_reason
+        self._last_reason = None
+        self._reason_cache.pop(key, None)
+        self.llm_service.evict_completion(
+            self._create_reasoning_prompt(task, current_state),
+            response_format=ActionModel
+        )
+    
+    def _cache_put(self, key: bytes, value: Any):
+        """Memoize an LLM response, evicting the least recently used entry"""
+        self._reason_cache[key] = value
+        self._reason_cache.move_to_end(key)
+        if len(self._reason_cache) > self.REASON_CACHE_SIZE:
+            self._reason_cache.popitem(last=False)
     
     def _create_reasoning_prompt(self, task: str, current_state: CurrentPageState) -> str:
         """
         Create prompt for reasoning about next action
         """
-        return f"""
-        You are a browser automation agent. Your task is: {task}
-        
-        Current page state:
-        - URL: {current_state.url}
-        - Title: {current_state.title}
-        - Content: {current_state.content}
-        
-        Available actions:
-        - click(element_id): Click on an element with the given ID
-        - type(element_id, text): Type text into an element with the given ID
-        - scroll(direction): Scroll up/down
-        - goto(url): Navigate to a URL
-        - wait(seconds): Wait for specified seconds
-        - stop: Stop the task execution
-        
-        Please provide the next action to take in JSON format:
-        {{
-            "action": "...",
-            "parameters": {{}}
-        }}
+        return self._render_prompt(
+            REASONING_PROMPT,
+            task,
+            url=current_state.url,
+            title=current_state.title,
+            content=_compact_content(current_state.content, self.CONTENT_BUDGET)
+        )
+    
+    def _render_prompt(self, template: str, task: str, **fields: str) -> str:
+        """
+        Render a prompt template, switching to a specialized builder once
+        the template has been rendered HOT_THRESHOLD times for this task.
+        Counts and builders are kept for the PROMPT_CACHE_SIZE most recent tasks.
         """
+        key = (template, task)
+        build = self._prompt_hot.get(key)
+        if build is not None:
+            self._prompt_hot.move_to_end(key)
+            return build(**fields)
+        
+        count = self._prompt_call_count.pop(key, 0) + 1
+        if count >= HOT_THRESHOLD:
+            self._prompt_hot[key] = _specialize_prompt(template, task=task)
+            if len(self._prompt_hot) > self.PROMPT_CACHE_SIZE:
+                self._prompt_hot.popitem(last=False)
+        else:
+            self._prompt_call_count[key] = count
+            if len(self._prompt_call_count) > self.PROMPT_CACHE_SIZE:
+                self._prompt_call_count.popitem(last=False)
+        return template.format(task=task, **fields)
     
     async def _execute_action(self, action: ActionModel) -> ActionResult:
         """
@@ -145,7 +566,7 @@ class BrowserAgent:
         # This method is now mainly for compatibility - the actual execution
         # is handled by the BrowserUseAdapter
         execution_result = await self.browser.execute_action(action)
-        return ActionResult(
+        return ActionResult.model_construct(
             action=action,
             success=execution_result.success,
             result=execution_result.result
@@ -165,56 +586,102 @@ class PlanAndExecuteAgent(BrowserAgent):
         Plan the entire task first, then execute the plan
         """
         try:
-            # Initialize browser
-            await self.browser.start_session()
+            # Open a fresh context; the browser itself persists across tasks
+            await self.browser.begin_task()
             
-            # 1. Create plan
-            plan = await self._create_plan(task)
+            # 1. Create plan, collapsing back-to-back waits into one
+            plan = self._fuse_waits(await self._create_plan(task))
+            order = self._schedule_plan(plan)
+            # Plans are not bounded by max_steps; keep every step of this one
+            self.history.reserve(len(plan.steps))
             
-            # 2. Execute plan
-            for step_num, step in enumerate(plan.steps):
-                # Get current page state
-                current_state = await self.browser.get_current_page_state()
+            # 2. Run the plan through a generated coroutine when every step
+            # lowers, resuming on the generic path from whichever step raised
+            done = set()
+            run_plan = self._lower_plan(plan, order)
+            if run_plan is not None:
+                progress = [0]
+                try:
+                    await run_plan(self.browser.browser_service, self.history.record, progress)
+                    return AgentOutput(
+                        success=True,
+                        result="Task completed successfully",
+                        history=self.history.as_history()
+                    )
+                except BROWSER_ERRORS + (ValueError, TypeError) as e:
+                    # The step may have reached the page before raising, so it is
+                    # recorded as failed the way execute_action would, not replayed
+                    step_num = order[progress[0]]
+                    done = set(order[:progress[0] + 1])
+                    failed = await self._step_failed(
+                        plan, step_num, action_failure(plan.steps[step_num].action.action, e)
+                    )
+                    if failed is not None:
+                        return failed
+            
+            # 3. Execute plan steps one at a time, in dependency order
+            for step_num in order:
+                if step_num in done:
+                    continue
                 
                 # Execute action
-                execution_result = await self.browser.execute_action(step.action)
-                
-                # Add to history
-                self.history.add_step(step.action, ActionResult(
-                    action=step.action,
-                    success=execution_result.success,
-                    result=execution_result.result
-                ))
+                execution_result = await self.browser.execute_action(plan.steps[step_num].action)
                 
                 # Check if execution was successful
                 if not execution_result.success:
-                    # Try to recover or adjust plan
-                    recovery_result = await self._handle_error(step, ActionResult(
-                        action=step.action,
-                        success=execution_result.success,
-                        result=execution_result.result
-                    ), current_state)
-                    if not recovery_result.success:
-                        return AgentOutput(
-                            success=False,
-                            result=f"Failed to execute step {step_num}: {recovery_result.result}",
-                            history=self.history
-                        )
+                    failed = await self._step_failed(plan, step_num, execution_result)
+                    if failed is not None:
+                        return failed
+                else:
+                    self.history.record(
+                        plan.steps[step_num].action,
+                        execution_result.success,
+                        execution_result.result
+                    )
             
             return AgentOutput(
                 success=True,
                 result="Task completed successfully",
-                history=self.history
+                history=self.history.as_history()
             )
             
         except Exception as e:
             return AgentOutput(
                 success=False,
                 result=f"Error: {str(e)}",
-                history=self.history
+                history=self.history.as_history()
             )
         finally:
-            await self.browser.end_session()
+            self._cancel_pending_navigation()
+            await self.browser.end_task()
+    
+    async def _step_failed(
+        self,
+        plan: 'Plan',
+        step_num: int,
+        execution_result: BrowserActionResult
+    ) -> Optional[AgentOutput]:
+        """
+        Record a failed plan step and try to recover from it.
+        Returns the run's output when the plan cannot continue, else None.
+        """
+        step = plan.steps[step_num]
+        self.history.record(step.action, execution_result.success, execution_result.result)
+        
+        # Try to recover or adjust plan
+        current_state = await self.browser.get_current_page_state()
+        recovery_result = await self._handle_error(step, ActionResult.model_construct(
+            action=step.action,
+            success=execution_result.success,
+            result=execution_result.result
+        ), current_state)
+        if not recovery_result.success:
+            return AgentOutput(
+                success=False,
+                result=f"Failed to execute step {step_num}: {recovery_result.result}",
+                history=self.history.as_history()
+            )
+        return None
     
     async def _create_plan(self, task: str) -> 'Plan':
         """
@@ -226,18 +693,23 @@ class PlanAndExecuteAgent(BrowserAgent):
         Return the plan as a list of steps, each with an action and parameters.
         Available actions: click, type, scroll, goto, wait, stop
         
+        For each step, list in "depends_on" the indices of the earlier steps it
+        needs to have finished first. Use an empty list for steps that need nothing.
+        
         Example format:
         {{
             "steps": [
                 {{
                     "action": "goto",
                     "parameters": {{"url": "https://example.com"}},
-                    "description": "Navigate to example.com"
+                    "description": "Navigate to example.com",
+                    "depends_on": []
                 }},
                 {{
                     "action": "click",
                     "parameters": {{"element_id": "search-box"}},
-                    "description": "Click search box"
+                    "description": "Click search box",
+                    "depends_on": [0]
                 }}
             ]
         }}
@@ -245,18 +717,184 @@ class PlanAndExecuteAgent(BrowserAgent):
         
         response = await self.llm_service.get_completion(
             prompt,
-            response_format=Plan
+            response_format=Plan,
+            response_adapter=_PLAN_ADAPTER
         )
         
         return response
+    
+    def _lower_plan(self, plan: 'Plan', order: List[int]) -> Optional[Callable]:
+        """
+        Compile a plan into a coroutine that awaits the browser calls directly,
+        with no dispatch or parameter lookups. Returns None when a step cannot
+        be lowered statically.
+        
+        The coroutine takes the browser service, a history record callable and
+        a one-item progress list holding the position in order of the step being run.
+        """
+        lines = ["async def run_plan(service, record, progress):"]
+        actions = []
+        for position, step_num in enumerate(order):
+            action = plan.steps[step_num].action
+            call = _lower_action(action)
+            if call is None:
+                return None
+            
+            statement, message = call
+            lines.append(f"    progress[0] = {position}")
+            if statement:
+                lines.append(f"    {statement}")
+            lines.append(f"    record(actions[{len(actions)}], True, {message!r})")
+            actions.append(action)
+        
+        namespace: Dict[str, Any] = {"actions": tuple(actions), "sleep": asyncio.sleep}
+        exec("\n".join(lines) + "\n", namespace)
+        return namespace["run_plan"]
+    
+    def _fuse_waits(self, plan: 'Plan') -> 'Plan':
+        """
+        Merge runs of wait steps that each just follow the previous wait
+        into a single wait for the summed duration
+        """
+        steps: List[PlanStep] = []
+        new_index: List[int] = []
+        for step_num, step in enumerate(plan.steps):
+            previous = plan.steps[step_num - 1] if step_num else None
+            follows_previous = step.depends_on is None or set(step.depends_on) == {step_num - 1}
+            if (
+                previous is not None
+                and step.action.action == "wait"
+                and previous.action.action == "wait"
+                and follows_previous
+                # Durations that are not plain numbers are left for execution to reject
+                and _wait_seconds(steps[-1].action) is not None
+                and _wait_seconds(step.action) is not None
+            ):
+                fused = steps[-1]
+                seconds = _wait_seconds(fused.action) + _wait_seconds(step.action)
+                steps[-1] = fused.model_copy(update={
+                    "action": fused.action.model_copy(
+                        update={"parameters": {**fused.action.parameters, "seconds": seconds}}
+                    ),
+                    "description": f"{fused.description}; {step.description}"
+                })
+            else:
+                steps.append(step)
+            new_index.append(len(steps) - 1)
+        
+        if len(steps) == len(plan.steps):
+            return plan
+        
+        # Point dependencies at the fused step numbers
+        for step_num, step in enumerate(steps):
+            if step.depends_on is not None:
+                depends_on = sorted({
+                    new_index[dep] for dep in step.depends_on
+                    if 0 <= dep < len(new_index) and new_index[dep] != step_num
+                })
+                steps[step_num] = step.model_copy(update={"depends_on": depends_on})
+        
+        return plan.model_copy(update={"steps": steps})
+    
+    def _schedule_plan(self, plan: 'Plan') -> List[int]:
+        """
+        Order plan steps so each runs after its dependencies, always taking
+        the lowest-numbered ready step so steps only leave plan order when
+        their dependencies require it. Steps share one page, so they run
+        one at a time.
+        """
+        steps = plan.steps
+        dependencies = []
+        for step_num, step in enumerate(steps):
+            if step.depends_on is None:
+                # Undeclared dependencies mean "after the previous step"
+                dependencies.append({step_num - 1} if step_num else set())
+            else:
+                dependencies.append({
+                    dep for dep in step.depends_on
+                    if 0 <= dep < len(steps) and dep != step_num
+                })
+        
+        order = []
+        done = set()
+        remaining = list(range(len(steps)))
+        while remaining:
+            # Fall back to plan order on a dependency cycle
+            step_num = next(
+                (step_num for step_num in remaining if dependencies[step_num] <= done),
+                remaining[0]
+            )
+            order.append(step_num)
+            done.add(step_num)
+            remaining.remove(step_num)
+        
+        return order
+
+
+def _wait_seconds(action: ActionModel) -> Optional[float]:
+    """A wait action's duration, or None when it is not a plain finite number"""
+    seconds = action.parameters.get("seconds", 1)
+    if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not math.isfinite(seconds):
+        return None
+    return seconds
+
+
+def _lower_action(action: ActionModel) -> Optional[tuple]:
+    """
+    Lower an action to (statement, history message) for a generated plan
+    runner, mirroring BrowserUseAdapter's handlers. Returns None when the
+    parameters are missing or not plain literals.
+    """
+    parameters = action.parameters
+    
+    def text(name: str, default: Optional[str] = None) -> Optional[str]:
+        value = parameters.get(name, default)
+        return value if isinstance(value, str) and value else None
+    
+    if action.action == "click":
+        element_id = text("element_id")
+        if element_id is None:
+            return None
+        return f"await service.click_element({element_id!r})", f"Clicked element {element_id}"
+    if action.action == "type":
+        element_id, typed = text("element_id"), text("text")
+        if element_id is None or typed is None:
+            return None
+        return (
+            f"await service.type_text({element_id!r}, {typed!r})",
+            f"Typed '{typed}' into element {element_id}"
+        )
+    if action.action == "scroll":
+        direction = text("direction", "down")
+        if direction is None:
+            return None
+        return f"await service.scroll_page({direction!r})", f"Scrolled {direction}"
+    if action.action == "goto":
+        url = text("url")
+        if url is None:
+            return None
+        return f"await service.go_to_url({url!r})", f"Navigated to {url}"
+    if action.action == "wait":
+        seconds = _wait_seconds(action)
+        if seconds is None:
+            return None
+        return f"await sleep({seconds!r})", f"Waited for {seconds} seconds"
+    if action.action == "stop":
+        return "", "Stop action received"
+    return None
 
 
 class PlanStep(BaseModel):
+    model_config = _FROZEN_MODEL
+    
     action: ActionModel
     description: str
+    depends_on: Optional[List[int]] = None  # None means "after the previous step"
 
 
 class Plan(BaseModel):
+    model_config = _FROZEN_MODEL
+    
     steps: List[PlanStep]
 
 
@@ -268,43 +906,53 @@ class ReflectionAgent(BrowserAgent):
     def __init__(self, llm_service: LLMService, max_steps: int = 50, max_reflections: int = 3, headless: bool = True):
         super().__init__(llm_service, max_steps, headless)
         self.max_reflections = max_reflections
+        # A correction can add a second history entry per step
+        self.history = RingHistory(2 * max_steps)
     
     async def run_task(self, task: str) -> AgentOutput:
         """
         Run task with reflection and self-correction
         """
         try:
-            # Initialize browser
-            await self.browser.start_session()
+            # Open a fresh context; the browser itself persists across tasks
+            await self.browser.begin_task()
             
+            current_state = None
             for step in range(self.max_steps):
-                # 1. Observe current page state
-                current_state = await self.browser.get_current_page_state()
+                # 1. Observe current page state, reusing the one the last action returned
+                if current_state is None:
+                    current_state = await self.browser.get_current_page_state()
                 
                 # 2. Reason about next action
                 action_result = await self._think_and_act(task, current_state)
                 
                 # 3. Execute action
-                execution_result = await self.browser.execute_action(action_result.action)
+                execution_result = await self._execute(action_result.action)
+                if not execution_result.success:
+                    self._forget_last_decision()
+                
+                # Built once and shared by reflection and correction; every
+                # field comes from our own objects, so validation is skipped
+                step_result = ActionResult.model_construct(
+                    action=action_result.action,
+                    success=execution_result.success,
+                    result=execution_result.result
+                )
                 
                 # 4. Reflect on the result
                 reflection_result = await self._reflect_on_action(
                     task,
                     action_result.action,
-                    ActionResult(
-                        action=action_result.action,
-                        success=execution_result.success,
-                        result=execution_result.result
-                    ),
+                    step_result,
                     current_state
                 )
                 
                 # 5. Add to history
-                self.history.add_step(action_result, ActionResult(
-                    action=action_result.action,
-                    success=execution_result.success,
-                    result=execution_result.result
-                ))
+                self.history.record(
+                    action_result.action,
+                    execution_result.success,
+                    execution_result.result
+                )
                 
                 # 6. Check if task is completed
                 if action_result.action.action == "stop":
@@ -315,31 +963,37 @@ class ReflectionAgent(BrowserAgent):
                     correction_result = await self._correct_action(
                         task,
                         action_result.action,
-                        ActionResult(
-                            action=action_result.action,
-                            success=execution_result.success,
-                            result=execution_result.result
-                        ),
+                        step_result,
                         reflection_result.feedback
                     )
                     
                     if correction_result.success:
-                        self.history.add_step(correction_result.action, correction_result)
+                        self.history.record(
+                            correction_result.action,
+                            correction_result.success,
+                            correction_result.result
+                        )
+                    
+                    # The correction may have changed the page
+                    current_state = None
+                else:
+                    current_state = execution_result.page_state
             
             return AgentOutput(
                 success=True,
                 result="Task completed successfully",
-                history=self.history
+                history=self.history.as_history()
             )
             
         except Exception as e:
             return AgentOutput(
                 success=False,
                 result=f"Error: {str(e)}",
-                history=self.history
+                history=self.history.as_history()
             )
         finally:
-            await self.browser.end_session()
+            self._cancel_pending_navigation()
+            await self.browser.end_task()
     
     async def _reflect_on_action(
         self,
@@ -351,27 +1005,38 @@ class ReflectionAgent(BrowserAgent):
         """
         Reflect on whether the action was successful and appropriate
         """
-        prompt = f"""
-        Task: {task}
-        Action taken: {action.action} with parameters {action.parameters}
-        Execution result: {execution_result.result}
-        Current page state: {current_state}
-        
-        Was this action appropriate for the task? Did it succeed? What should be done next?
-        
-        Return in JSON format:
-        {{
-            "is_correct": true/false,
-            "feedback": "explanation of what happened and what should be done",
-            "suggested_next_action": "what action to take next"
-        }}
-        """
+        key = _fingerprint(
+            "reflect",
+            task,
+            *_action_signature(action),
+            execution_result.result,
+            current_state.url,
+            current_state.title,
+            _VOLATILE_TIME.sub("", current_state.content)
+        )
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        prompt = self._render_prompt(
+            REFLECTION_PROMPT,
+            task,
+            action=str(action.action),
+            parameters=str(action.parameters),
+            result=str(execution_result.result),
+            page=(
+                f"{current_state.url} ({current_state.title})\n"
+                f"{_compact_content(current_state.content, self.CONTENT_BUDGET)}"
+            )
+        )
         
         response = await self.llm_service.get_completion(
             prompt,
-            response_format=ReflectionResult
+            response_format=ReflectionResult,
+            response_adapter=_REFLECTION_ADAPTER
         )
         
+        self._cache_put(key, response)
         return response
     
     async def _correct_action(
@@ -384,36 +1049,82 @@ class ReflectionAgent(BrowserAgent):
         """
         Correct a failed action based on feedback
         """
-        prompt = f"""
-        Task: {task}
-        Failed action: {failed_action.action} with parameters {failed_action.parameters}
-        Execution result: {execution_result.result}
-        Feedback: {feedback}
-        
-        Based on the feedback, what should be the correct action to take?
-        
-        Return in JSON format:
-        {{
-            "action": "...",
-            "parameters": {{}}
-        }}
-        """
-        
-        response = await self.llm_service.get_completion(
-            prompt,
-            response_format=ActionModel
+        key = _fingerprint(
+            "correct",
+            task,
+            *_action_signature(failed_action),
+            execution_result.result,
+            feedback
         )
+        response = self._cache_get(key)
+        if response is None:
+            response = await self._request_correction(task, failed_action, execution_result, feedback)
+            self._cache_put(key, response)
         
-        # Execute the correction
+        # Execute the correction; a failed one is not worth replaying
         correction_result = await self.browser.execute_action(response)
-        return ActionResult(
+        if not correction_result.success:
+            self._reason_cache.pop(key, None)
+            self.llm_service.evict_completion(
+                self._correction_prompt(task, failed_action, execution_result, feedback),
+                response_format=ActionModel
+            )
+        return ActionResult.model_construct(
             action=response,
             success=correction_result.success,
             result=correction_result.result
         )
 
+    async def _request_correction(
+        self,
+        task: str,
+        failed_action: ActionModel,
+        execution_result: ActionResult,
+        feedback: str
+    ) -> ActionModel:
+        """
+        Ask the LLM for a corrected action
+        """
+        response = await self.llm_service.get_completion(
+            self._correction_prompt(task, failed_action, execution_result, feedback),
+            response_format=ActionModel,
+            response_adapter=_ACTION_ADAPTER
+        )
+        
+        return response
+
+    def _correction_prompt(
+        self,
+        task: str,
+        failed_action: ActionModel,
+        execution_result: ActionResult,
+        feedback: str
+    ) -> str:
+        """
+        Create prompt asking for a corrected action
+        """
+        return self._render_prompt(
+            CORRECTION_PROMPT,
+            task,
+            action=str(failed_action.action),
+            parameters=str(failed_action.parameters),
+            result=str(execution_result.result),
+            feedback=feedback
+        )
+
 
 class ReflectionResult(BaseModel):
+    model_config = _FROZEN_MODEL
+    
     is_correct: bool
     feedback: str
-    suggested_next_action: str
\ No newline at end of file
+    suggested_next_action: str
+
+
+# Compile validators at import time rather than on the first LLM response
+for _model in (ActionModel, ActionStep, PlanStep, Plan, ReflectionResult):
+    _model.model_rebuild()
+
+_ACTION_ADAPTER = TypeAdapter(ActionModel)
+_PLAN_ADAPTER = TypeAdapter(Plan)
+_REFLECTION_ADAPTER = TypeAdapter(ReflectionResult)
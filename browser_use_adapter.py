@@ -2,10 +2,16 @@
 Adapter for browser-use library integration
 This module provides the interface between our agent system and the browser-use library
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
 import asyncio
+import logging
+import math
+import logging.handlers
+import queue
 from dataclasses import dataclass
 
+logger = logging.getLogger(__name__)
+
 try:
     from browser_use.browser.service import BrowserService
     from browser_use.browser.views import CurrentPageState
@@ -15,10 +21,30 @@ try:
     BROWSER_USE_AVAILABLE = True
 except ImportError:
     BROWSER_USE_AVAILABLE = False
-    print("⚠️  browser-use library not found. Install it using: pip install browser-use")
+    logger.warning("browser-use library not found. Install it using: pip install browser-use")
+
+try:
+    from playwright.async_api import Error as PlaywrightError
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+
+# Failures the browser can raise while carrying out an action
+BROWSER_ERRORS: Tuple[type, ...] = (TimeoutError, ConnectionError, RuntimeError)
+if PLAYWRIGHT_AVAILABLE:
+    BROWSER_ERRORS += (PlaywrightError,)
+
+# Actions after which the page state is unchanged or never read:
+# a wait leaves the page as it was and a stop ends the task
+STATELESS_ACTIONS = frozenset({"wait", "stop"})
+
+
+class MissingParamError(ValueError):
+    """Raised when an action lacks a required parameter or has one of the wrong type"""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BrowserActionResult:
     """Result of a browser action"""
     success: bool
@@ -26,6 +52,22 @@ class BrowserActionResult:
     page_state: Optional[CurrentPageState] = None
 
 
+def action_failure(action: str, error: Exception) -> BrowserActionResult:
+    """Failed result for an action whose handler raised error"""
+    if isinstance(error, MissingParamError):
+        return BrowserActionResult(success=False, result=str(error))
+    if isinstance(error, (ValueError, TypeError)):
+        # Parameter values the browser rejects, e.g. an unsupported scroll direction
+        return BrowserActionResult(
+            success=False,
+            result=f"Invalid parameters for action {action}: {str(error)}"
+        )
+    return BrowserActionResult(
+        success=False,
+        result=f"Error executing action {action}: {str(error)}"
+    )
+
+
 class BrowserUseAdapter:
     """
     Adapter class to integrate browser-use library with our agent system
@@ -43,145 +85,170 @@ class BrowserUseAdapter:
             slow_mo=slow_mo
         )
         self.session_active = False
+        self.task_active = False
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Tuple[str, bool]]]] = {
+            "click": self._do_click,
+            "type": self._do_type,
+            "scroll": self._do_scroll,
+            "goto": self._do_goto,
+            "wait": self._do_wait,
+            "stop": self._do_stop,
+        }
     
-    async def start_session(self):
-        """Start a new browser session"""
+    async def ensure_session(self):
+        """Start the browser session once; later calls reuse it"""
+        if self.session_active:
+            return
         await self.browser_service.create_session()
         self.session_active = True
-        print("🌐 Браузерная сессия запущена")
+        logger.info("Browser session started")
     
-    async def end_session(self):
-        """End the current browser session"""
+    async def begin_task(self):
+        """Open a fresh browser context for a task, starting the browser if needed"""
+        await self.ensure_session()
+        if self.task_active:
+            await self.end_task()
+        await self.browser_service.new_context()
+        self.task_active = True
+    
+    async def end_task(self):
+        """Close the current task's browser context, keeping the browser running"""
+        if self.task_active:
+            await self.browser_service.close_context()
+            self.task_active = False
+    
+    async def shutdown(self):
+        """Close any open task context and the browser session"""
+        await self.end_task()
         if self.session_active:
             await self.browser_service.close_session()
             self.session_active = False
-            print("🔒 Браузерная сессия завершена")
+            logger.info("Browser session closed")
     
     async def get_current_page_state(self) -> CurrentPageState:
         """Get the current state of the page"""
         if not self.session_active:
-            raise RuntimeError("Browser session not active. Call start_session() first.")
+            raise RuntimeError("Browser session not active. Call ensure_session() first.")
         
         return await self.browser_service.get_current_page_state()
     
     async def execute_action(self, action: ActionModel) -> BrowserActionResult:
         """Execute a browser action"""
         if not self.session_active:
-            raise RuntimeError("Browser session not active. Call start_session() first.")
+            raise RuntimeError("Browser session not active. Call ensure_session() first.")
+        
+        handler = self._handlers.get(action.action)
+        if handler is None:
+            return BrowserActionResult(
+                success=False,
+                result=f"Unknown action: {action.action}"
+            )
         
         try:
-            if action.action == "click":
-                element_id = action.parameters.get("element_id")
-                if element_id:
-                    await self.browser_service.click_element(element_id)
-                    return BrowserActionResult(
-                        success=True,
-                        result=f"Clicked element {element_id}",
-                        page_state=await self.get_current_page_state()
-                    )
-                else:
-                    return BrowserActionResult(
-                        success=False,
-                        result="Missing element_id parameter for click action"
-                    )
-            
-            elif action.action == "type":
-                element_id = action.parameters.get("element_id")
-                text = action.parameters.get("text")
-                if element_id and text:
-                    await self.browser_service.type_text(element_id, text)
-                    return BrowserActionResult(
-                        success=True,
-                        result=f"Typed '{text}' into element {element_id}",
-                        page_state=await self.get_current_page_state()
-                    )
-                else:
-                    return BrowserActionResult(
-                        success=False,
-                        result="Missing element_id or text parameter for type action"
-                    )
-            
-            elif action.action == "scroll":
-                direction = action.parameters.get("direction", "down")
-                await self.browser_service.scroll_page(direction)
-                return BrowserActionResult(
-                    success=True,
-                    result=f"Scrolled {direction}",
-                    page_state=await self.get_current_page_state()
-                )
-            
-            elif action.action == "goto":
-                url = action.parameters.get("url")
-                if url:
-                    await self.browser_service.go_to_url(url)
-                    return BrowserActionResult(
-                        success=True,
-                        result=f"Navigated to {url}",
-                        page_state=await self.get_current_page_state()
-                    )
-                else:
-                    return BrowserActionResult(
-                        success=False,
-                        result="Missing url parameter for goto action"
-                    )
-            
-            elif action.action == "wait":
-                seconds = action.parameters.get("seconds", 1)
-                await asyncio.sleep(seconds)
-                return BrowserActionResult(
-                    success=True,
-                    result=f"Waited for {seconds} seconds",
-                    page_state=await self.get_current_page_state()
-                )
-            
-            elif action.action == "stop":
-                return BrowserActionResult(
-                    success=True,
-                    result="Stop action received",
-                    page_state=await self.get_current_page_state()
-                )
-            
-            else:
-                return BrowserActionResult(
-                    success=False,
-                    result=f"Unknown action: {action.action}"
-                )
+            result, success = await handler(action.parameters)
+        except BROWSER_ERRORS + (ValueError, TypeError) as e:
+            return action_failure(action.action, e)
+        
+        # Skip the refetch when the action cannot have changed the page;
+        # callers that need the state fetch it themselves
+        if not success or action.action in STATELESS_ACTIONS:
+            return BrowserActionResult(success=success, result=result)
         
-        except Exception as e:
+        try:
+            page_state = await self.get_current_page_state()
+        except BROWSER_ERRORS as e:
             return BrowserActionResult(
                 success=False,
-                result=f"Error executing action {action.action}: {str(e)}"
+                result=f"Error reading page state after {action.action}: {str(e)}"
             )
+        return BrowserActionResult(success=success, result=result, page_state=page_state)
+    
+    async def _do_click(self, parameters: Dict[str, Any]) -> Tuple[str, bool]:
+        element_id = parameters.get("element_id")
+        if not element_id:
+            raise MissingParamError("Missing element_id parameter for click action")
+        await self.browser_service.click_element(element_id)
+        return f"Clicked element {element_id}", True
+    
+    async def _do_type(self, parameters: Dict[str, Any]) -> Tuple[str, bool]:
+        element_id = parameters.get("element_id")
+        text = parameters.get("text")
+        if not (element_id and text):
+            raise MissingParamError("Missing element_id or text parameter for type action")
+        await self.browser_service.type_text(element_id, text)
+        return f"Typed '{text}' into element {element_id}", True
+    
+    async def _do_scroll(self, parameters: Dict[str, Any]) -> Tuple[str, bool]:
+        direction = parameters.get("direction", "down")
+        if not (isinstance(direction, str) and direction):
+            raise MissingParamError("Invalid direction parameter for scroll action")
+        await self.browser_service.scroll_page(direction)
+        return f"Scrolled {direction}", True
+    
+    async def _do_goto(self, parameters: Dict[str, Any]) -> Tuple[str, bool]:
+        url = parameters.get("url")
+        if not url:
+            raise MissingParamError("Missing url parameter for goto action")
+        await self.browser_service.go_to_url(url)
+        return f"Navigated to {url}", True
+    
+    async def _do_wait(self, parameters: Dict[str, Any]) -> Tuple[str, bool]:
+        seconds = parameters.get("seconds", 1)
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not math.isfinite(seconds):
+            raise MissingParamError("Invalid seconds parameter for wait action")
+        await asyncio.sleep(seconds)
+        return f"Waited for {seconds} seconds", True
+    
+    async def _do_stop(self, parameters: Dict[str, Any]) -> Tuple[str, bool]:
+        return "Stop action received", True
     
     async def take_screenshot(self, path: str = None) -> str:
         """Take a screenshot of the current page"""
         if not self.session_active:
-            raise RuntimeError("Browser session not active. Call start_session() first.")
+            raise RuntimeError("Browser session not active. Call ensure_session() first.")
         
         return await self.browser_service.take_screenshot(path)
     
     async def get_page_content(self) -> str:
         """Get the text content of the current page"""
         if not self.session_active:
-            raise RuntimeError("Browser session not active. Call start_session() first.")
+            raise RuntimeError("Browser session not active. Call ensure_session() first.")
         
         page_state = await self.get_current_page_state()
         return page_state.content
 
 
+def enable_background_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Route this module's log records through a queue so that handler I/O
+    runs on a listener thread instead of blocking the event loop.
+    Returns the started listener; call stop() on it at shutdown to flush.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
 # Example usage of the adapter
 async def example_usage():
     """
     Example of how to use the BrowserUseAdapter with our agent system
     """
-    print("🧪 Тестирую интеграцию с browser-use...")
+    logger.info("Testing browser-use integration...")
     
     # Create adapter
     adapter = BrowserUseAdapter(headless=True)
     
     try:
         # Start session
-        await adapter.start_session()
+        await adapter.begin_task()
         
         # Go to a test page
         action = ActionModel(
@@ -189,25 +256,29 @@ async def example_usage():
             parameters={"url": "https://httpbin.org/forms/post"}
         )
         result = await adapter.execute_action(action)
-        print(f"Navigation result: {result.result}")
+        logger.info("Navigation result: %s", result.result)
         
         # Get page state
         page_state = await adapter.get_current_page_state()
-        print(f"Current page: {page_state.title}")
+        logger.info("Current page: %s", page_state.title)
         
         # Take screenshot
         screenshot_path = await adapter.take_screenshot("test_screenshot.png")
-        print(f"Screenshot saved to: {screenshot_path}")
+        logger.info("Screenshot saved to: %s", screenshot_path)
         
     except Exception as e:
-        print(f"Error in example: {e}")
+        logger.error("Error in example: %s", e)
     finally:
         # End session
-        await adapter.end_session()
+        await adapter.shutdown()
 
 
 if __name__ == "__main__":
-    if BROWSER_USE_AVAILABLE:
-        asyncio.run(example_usage())
-    else:
-        print("browser-use library is not available. Please install it to run this example.")
\ No newline at end of file
+    listener = enable_background_logging()
+    try:
+        if BROWSER_USE_AVAILABLE:
+            asyncio.run(example_usage())
+        else:
+            logger.error("browser-use library is not available. Please install it to run this example.")
+    finally:
+        listener.stop()
\ No newline at end of file
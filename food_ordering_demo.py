@@ -1,6 +1,7 @@
 import asyncio
+import logging
 from typing import Dict, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from browser_agent.agent import BrowserAgent, ReflectionAgent
 from browser_agent.memory import AgentMemory
@@ -8,22 +9,19 @@ from browser_agent.security import SecurityManager, SecurityConfig
 from browser_agent.llm_service import LLMService
 from config import config
 
+logger = logging.getLogger("food_ordering")
 
-@dataclass
+BANNER = "=" * 60
+
+
+@dataclass(slots=True)
 class FoodOrderConfig:
     """Configuration for food ordering agent"""
     delivery_service_url: str = "https://eda.yandex.ru"  # Example: Yandex.Eda
-    user_credentials: Dict[str, str] = None
-    preferred_restaurants: list = None
-    favorite_items: list = None
-    
-    def __post_init__(self):
-        if self.user_credentials is None:
-            self.user_credentials = {}
-        if self.preferred_restaurants is None:
-            self.preferred_restaurants = []
-        if self.favorite_items is None:
-            self.favorite_items = ["BBQ-бургер", "картошка фри"]
+    user_credentials: Dict[str, str] = field(default_factory=dict)
+    preferred_restaurants: list = field(default_factory=list)
+    favorite_items: list = field(default_factory=lambda: ["BBQ-бургер", "картошка фри"])
+    simulate_latency: float = 0.0  # Seconds of simulated page work per step; 0 disables the waits
 
 
 class FoodOrderingAgent:
@@ -37,7 +35,7 @@ class FoodOrderingAgent:
         self.config = config
         self.llm_service = llm_service
         self.memory = AgentMemory()
-        self.security = SecurityManager(SecurityConfig())
+        self.security = SecurityManager(SecurityConfig.fast())
         self.agent = ReflectionAgent(llm_service)  # Using reflection agent for better error handling
     
     async def order_food(self, food_items: list = None, restaurant_hint: str = "") -> Dict[str, Any]:
@@ -47,60 +45,62 @@ class FoodOrderingAgent:
         if food_items is None:
             food_items = self.config.favorite_items
             
-        print(f"🎯 Начинаю заказ еды: {', '.join(food_items)}")
+        items_joined = ", ".join(food_items)
+        
+        logger.info("🎯 Начинаю заказ еды: %s", items_joined)
         if restaurant_hint:
-            print(f"📍 Ресторан: {restaurant_hint}")
+            logger.info("📍 Ресторан: %s", restaurant_hint)
         
         try:
-            # Add task to memory
-            await self.memory.save_task_result_to_long_term(
-                task=f"Order {', '.join(food_items)}",
+            # Add task to memory in the background
+            self.memory.queue_long_term_save(
+                task=f"Order {items_joined}",
                 result="Started food ordering process",
                 success=True,
                 importance=0.9
             )
             
             # Step 1: Navigate to delivery service
-            print("🌐 Открываю сервис доставки еды...")
+            logger.info("🌐 Открываю сервис доставки еды...")
             result = await self._navigate_to_delivery_service()
             if not result["success"]:
                 return result
             
             # Step 2: Find restaurant
-            print("🔍 Ищу ресторан...")
-            restaurant_result = await self._find_restaurant(food_items, restaurant_hint)
+            logger.info("🔍 Ищу ресторан...")
+            restaurant_result = await self._find_restaurant(food_items, restaurant_hint, items_joined)
             if not restaurant_result["success"]:
                 return restaurant_result
             
             restaurant_name = restaurant_result["restaurant_name"]
-            print(f"🍽️  Найден ресторан: {restaurant_name}")
+            logger.info("🍽️  Найден ресторан: %s", restaurant_name)
             
             # Step 3: Add items to cart
-            print("🛒 Добавляю товары в корзину...")
-            cart_result = await self._add_items_to_cart(food_items)
+            logger.info("🛒 Добавляю товары в корзину...")
+            cart_result = await self._add_items_to_cart(food_items, items_joined)
             if not cart_result["success"]:
                 return cart_result
             
             # Step 4: Proceed to checkout
-            print("💳 Перехожу к оформлению заказа...")
+            logger.info("💳 Перехожу к оформлению заказа...")
             checkout_result = await self._proceed_to_checkout()
             if not checkout_result["success"]:
                 return checkout_result
             
             # Step 5: Complete order (stop before payment as per requirements)
-            print("✅ Заказ оформлен (остановка перед оплатой)")
+            logger.info("✅ Заказ оформлен (остановка перед оплатой)")
             return {
                 "success": True,
-                "result": f"Заказ {', '.join(food_items)} из {restaurant_name} готов к оплате",
+                "result": f"Заказ {items_joined} из {restaurant_name} готов к оплате",
                 "order_summary": cart_result["items"]
             }
             
         except Exception as e:
             error_msg = f"Ошибка при заказе еды: {str(e)}"
-            print(error_msg)
+            logger.error(error_msg)
             
-            await self.memory.save_task_result_to_long_term(
-                task=f"Order {', '.join(food_items)}",
+            self.memory.queue_long_term_save(
+                task=f"Order {items_joined}",
                 result=error_msg,
                 success=False,
                 importance=0.9
@@ -118,10 +118,11 @@ class FoodOrderingAgent:
         try:
             # In a real implementation, this would interact with the browser through browser-use
             # For demo purposes, we'll simulate the action
-            print(f"  → Перехожу на {self.config.delivery_service_url}")
+            logger.info("  → Перехожу на %s", self.config.delivery_service_url)
             
             # Simulate waiting for page load
-            await asyncio.sleep(1)
+            if self.config.simulate_latency:
+                await asyncio.sleep(self.config.simulate_latency)
             
             return {
                 "success": True,
@@ -133,17 +134,19 @@ class FoodOrderingAgent:
                 "result": f"Не удалось перейти на сервис доставки: {str(e)}"
             }
     
-    async def _find_restaurant(self, food_items: list, restaurant_hint: str = "") -> Dict[str, Any]:
+    async def _find_restaurant(self, food_items: list, restaurant_hint: str = "", items_joined: str = "") -> Dict[str, Any]:
         """
         Find a restaurant that serves the requested food items
         """
+        items_joined = items_joined or ", ".join(food_items)
         try:
             # Check memory for previously ordered restaurants
             if restaurant_hint:
                 # If user specified a restaurant, try to find it
-                print(f"  → Ищу ресторан по подсказке: {restaurant_hint}")
+                logger.info("  → Ищу ресторан по подсказке: %s", restaurant_hint)
                 # Simulate finding the restaurant
-                await asyncio.sleep(1)
+                if self.config.simulate_latency:
+                    await asyncio.sleep(self.config.simulate_latency)
                 return {
                     "success": True,
                     "restaurant_name": restaurant_hint,
@@ -151,15 +154,16 @@ class FoodOrderingAgent:
                 }
             else:
                 # Look for restaurants that serve the requested items
-                print(f"  → Ищу рестораны с {', '.join(food_items)}")
+                logger.info("  → Ищу рестораны с %s", items_joined)
                 
                 # Check memory for previously ordered restaurants
                 common_restaurants = await self.memory.get_common_tasks()
                 for task in common_restaurants:
                     if "ресторан" in task.lower() or "заказ" in task.lower():
-                        print(f" → Найден предыдущий ресторан из памяти")
+                        logger.info(" → Найден предыдущий ресторан из памяти")
                         # Simulate finding the restaurant
-                        await asyncio.sleep(1)
+                        if self.config.simulate_latency:
+                            await asyncio.sleep(self.config.simulate_latency)
                         return {
                             "success": True,
                             "restaurant_name": task.split()[-1] if task.split() else "Известный ресторан",
@@ -167,11 +171,12 @@ class FoodOrderingAgent:
                         }
                 
                 # If not found in memory, simulate search
-                await asyncio.sleep(1)
+                if self.config.simulate_latency:
+                    await asyncio.sleep(self.config.simulate_latency)
                 return {
                     "success": True,
                     "restaurant_name": "BBQ Palace",
-                    "result": f"Найден подходящий ресторан по запросу {', '.join(food_items)}"
+                    "result": f"Найден подходящий ресторан по запросу {items_joined}"
                 }
                 
         except Exception as e:
@@ -180,23 +185,20 @@ class FoodOrderingAgent:
                 "result": f"Не удалось найти ресторан: {str(e)}"
             }
     
-    async def _add_items_to_cart(self, food_items: list) -> Dict[str, Any]:
+    async def _add_items_to_cart(self, food_items: list, items_joined: str = "") -> Dict[str, Any]:
         """
         Add requested food items to cart
         """
+        items_joined = items_joined or ", ".join(food_items)
         try:
-            print(f"  → Добавляю в корзину: {', '.join(food_items)}")
+            logger.info("  → Добавляю в корзину: %s", items_joined)
             
-            # Simulate adding items to cart
-            added_items = []
-            for item in food_items:
-                print(f"    - Добавляю {item}")
-                await asyncio.sleep(0.5)  # Simulate time to add item
-                added_items.append(item)
+            # Simulate adding items to cart; items are independent, so add them concurrently
+            added_items = await asyncio.gather(*(self._add_one(item) for item in food_items))
             
             return {
                 "success": True,
-                "result": f"Успешно добавлено в корзину: {', '.join(added_items)}",
+                "result": f"Успешно добавлено в корзину: {items_joined}",
                 "items": added_items
             }
         except Exception as e:
@@ -205,15 +207,25 @@ class FoodOrderingAgent:
                 "result": f"Не удалось добавить товары в корзину: {str(e)}"
             }
     
+    async def _add_one(self, item: str) -> str:
+        """
+        Add a single food item to cart
+        """
+        logger.info("    - Добавляю %s", item)
+        if self.config.simulate_latency:
+            await asyncio.sleep(self.config.simulate_latency / 2)  # Simulate time to add item
+        return item
+    
     async def _proceed_to_checkout(self) -> Dict[str, Any]:
         """
         Proceed to checkout page
         """
         try:
-            print("  → Перехожу к оформлению заказа")
+            logger.info("  → Перехожу к оформлению заказа")
             
             # Simulate navigating to checkout
-            await asyncio.sleep(1)
+            if self.config.simulate_latency:
+                await asyncio.sleep(self.config.simulate_latency)
             
             return {
                 "success": True,
@@ -230,8 +242,8 @@ async def main():
     """
     Main function to demonstrate the food ordering agent
     """
-    print("🤖 Запускаю демонстрацию агентской системы для заказа еды")
-    print("="*60)
+    logger.info("🤖 Запускаю демонстрацию агентской системы для заказа еды")
+    logger.info(BANNER)
     
     # Initialize LLM service with configuration
     api_key = None
@@ -252,16 +264,17 @@ async def main():
     food_config = FoodOrderConfig(
         delivery_service_url=config.DEFAULT_DELIVERY_SERVICE_URL,
         favorite_items=["BBQ-бургер", "картошка фри"],
-        preferred_restaurants=["BBQ Palace", "Мясная лавка"]
+        preferred_restaurants=["BBQ Palace", "Мясная лавка"],
+        simulate_latency=1.0
     )
     
     # Create the agent
     agent = FoodOrderingAgent(llm_service, food_config)
     
     # Example user request: "Закажи мне BBQ-бургер и картошку фри из того места, откуда я заказывал на прошлой неделе"
-    print("📝 Пример запроса пользователя:")
-    print('   "Закажи мне BBQ-бургер и картошку фри из того места, откуда я заказывал на прошлой неделе"')
-    print()
+    logger.info("📝 Пример запроса пользователя:")
+    logger.info('   "Закажи мне BBQ-бургер и картошку фри из того места, откуда я заказывал на прошлой неделе"')
+    logger.info("")
     
     # Execute the task
     result = await agent.order_food(
@@ -269,15 +282,19 @@ async def main():
         restaurant_hint="BBQ Palace" # Simulating knowledge of previous restaurant
     )
     
-    print()
-    print("="*60)
-    print("📋 Результат выполнения задачи:")
-    print(f"   Успех: {result['success']}")
-    print(f"   Результат: {result['result']}")
+    logger.info("")
+    logger.info(BANNER)
+    logger.info("📋 Результат выполнения задачи:")
+    logger.info("   Успех: %s", result['success'])
+    logger.info("   Результат: %s", result['result'])
     
     if result['success'] and 'order_summary' in result:
-        print(f"   Заказ: {', '.join(result['order_summary'])}")
+        logger.info("   Заказ: %s", ", ".join(result['order_summary']))
+    
+    # Let queued memory writes finish before the loop shuts down
+    await agent.memory.close()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     asyncio.run(main())
\ No newline at end of file
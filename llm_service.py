@@ -1,10 +1,171 @@
+import asyncio
+import functools
+import hashlib
 import json
-from typing import Dict, Any, Optional, Type
-from pydantic import BaseModel
-import openai
-import instructor
-import google.generativeai as genai
-from google.generativeai import GenerativeModel
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Optional, Type
+from pydantic import BaseModel, TypeAdapter
+
+# sentence_transformers (and torch with it) is imported only once a
+# semantic_cache_model is actually used, see _semantic_encoder
+try:
+    import faiss
+    import numpy as np
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+@functools.cache
+def _adapter_for(model: Type[BaseModel]) -> TypeAdapter:
+    """Validator for a response model, built once per class"""
+    return TypeAdapter(model)
+
+
+@functools.cache
+def _schema_for(model: Type[BaseModel]) -> dict:
+    """JSON schema for a response model, generated once per class; treat as read-only"""
+    return model.model_json_schema()
+
+
+@functools.cache
+def _json_instructions_for(model: Type[BaseModel]) -> str:
+    """Prompt suffix asking Gemini for JSON matching the model's schema, rendered once per class"""
+    return f"\n\nPlease respond in JSON format with the following structure:\n{json.dumps(_schema_for(model), indent=2)}\n\nRespond with only the JSON object, no additional text."
+
+
+_MISS = object()
+
+# Cosine similarity above which a cached completion answers a new prompt
+SEMANTIC_CACHE_THRESHOLD = 0.95
+# Completions sampled above this temperature are meant to vary, so they bypass the cache
+CACHEABLE_MAX_TEMPERATURE = 0.3
+
+
+@functools.cache
+def _semantic_encoder(model_name: Optional[str]) -> Optional["SentenceTransformer"]:
+    """Prompt encoder for the semantic cache tier, loaded once per model name"""
+    if not model_name or not SEMANTIC_CACHE_AVAILABLE:
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    return SentenceTransformer(model_name)
+
+
+def cached_completion(maxsize: int = 4096):
+    """
+    Cache parsed completions process-wide in two tiers. The first tier
+    matches an exact hash of the prompt; the second, used only when the
+    service has a semantic_cache_model and the caller passes
+    semantic_cache=True, matches prompts whose embeddings are within
+    SEMANTIC_CACHE_THRESHOLD cosine similarity of a cached one. Prompts that
+    differ only in details such as page content look alike to the encoder,
+    so callers opt in per request where near-duplicates really are
+    interchangeable. Both tiers are scoped to the provider, model, response
+    format and sampling settings.
+    Hits skip both the provider call and response validation. Call
+    cache_clear() on the decorated method to reset it, or
+    cache_evict(service, prompt, ...) to drop one completion that turned
+    out to be wrong.
+    """
+    def decorator(func):
+        cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        # scope -> (inner-product index over unit prompt embeddings, results by row)
+        semantic: Dict[tuple, tuple] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        async def wrapper(
+            self,
+            prompt: str,
+            response_format: Optional[Type[BaseModel]] = None,
+            max_tokens: int = 1000,
+            temperature: float = 0.1,
+            response_adapter: Optional[TypeAdapter] = None,
+            *,
+            semantic_cache: bool = False
+        ):
+            if temperature > CACHEABLE_MAX_TEMPERATURE:
+                return await func(self, prompt, response_format, max_tokens, temperature, response_adapter)
+
+            scope, key = cache_key(self, prompt, response_format, max_tokens, temperature)
+            with lock:
+                result = cache.get(key, _MISS)
+                if result is not _MISS:
+                    cache.move_to_end(key)
+                    return result
+
+            encoder = _semantic_encoder(self.semantic_cache_model) if semantic_cache else None
+            if encoder is not None:
+                # Encoding is CPU-bound, so keep it off the event loop
+                vector = await asyncio.to_thread(
+                    encoder.encode, [prompt], normalize_embeddings=True, convert_to_numpy=True
+                )
+                vector = vector.astype(np.float32)
+                with lock:
+                    entry = semantic.get(scope)
+                    if entry is not None:
+                        scores, ids = entry[0].search(vector, 1)
+                        if ids[0][0] >= 0 and scores[0][0] >= SEMANTIC_CACHE_THRESHOLD:
+                            result = entry[1][ids[0][0]]
+                            if result is not _MISS:
+                                return result
+
+            result = await func(self, prompt, response_format, max_tokens, temperature, response_adapter)
+
+            with lock:
+                cache[key] = result
+                cache.move_to_end(key)
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+
+                if encoder is not None:
+                    entry = semantic.get(scope)
+                    if entry is None or len(entry[1]) >= maxsize:
+                        entry = semantic[scope] = (faiss.IndexFlatIP(vector.shape[1]), [])
+                    entry[0].add(vector)
+                    entry[1].append(result)
+            return result
+
+        def cache_key(self, prompt, response_format, max_tokens, temperature):
+            scope = (self.provider, self.model, response_format, max_tokens, temperature)
+            return scope, (scope, hashlib.blake2b(prompt.encode(), digest_size=16).digest())
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                semantic.clear()
+
+        def cache_evict(
+            self,
+            prompt: str,
+            response_format: Optional[Type[BaseModel]] = None,
+            max_tokens: int = 1000,
+            temperature: float = 0.1
+        ):
+            scope, key = cache_key(self, prompt, response_format, max_tokens, temperature)
+            with lock:
+                result = cache.pop(key, _MISS)
+                entry = semantic.get(scope)
+                if result is _MISS or entry is None:
+                    return
+                # Index rows cannot be removed cheaply, so the result is blanked instead
+                results = entry[1]
+                for row, cached in enumerate(results):
+                    if cached is result:
+                        results[row] = _MISS
+
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_evict = cache_evict
+        return wrapper
+    return decorator
 
 
 class LLMService:
@@ -13,32 +174,49 @@ class LLMService:
     Uses instructor library for structured outputs
     """
     
+    # Provider SDKs, imported on first use of that provider and shared by all instances
+    _openai_mod = None
+    _instructor_mod = None
+    _genai_mod = None
+    
     def __init__(
         self,
         model: str = "gpt-4o",
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
-        provider: str = "openai"
+        provider: str = "openai",
+        semantic_cache_model: Optional[str] = None
     ):
         self.model = model
         self.provider = provider
+        # Local embedding model (e.g. "sentence-transformers/all-MiniLM-L6-v2")
+        # enabling near-duplicate prompt caching; None keeps exact matching only
+        self.semantic_cache_model = semantic_cache_model
         
         if provider == "openai":
             # Set up OpenAI client with instructor for structured outputs
+            # The async client lets concurrent completions overlap on the event loop
+            if LLMService._openai_mod is None:
+                import openai
+                import instructor
+                LLMService._openai_mod = openai
+                LLMService._instructor_mod = instructor
             if api_key:
-                self.client = instructor.from_openai(
-                    openai.OpenAI(api_key=api_key, base_url=base_url)
-                )
+                self.raw_client = self._openai_mod.AsyncOpenAI(api_key=api_key, base_url=base_url)
             else:
                 # If no API key provided, try to get from environment
-                self.client = instructor.from_openai(openai.OpenAI())
+                self.raw_client = self._openai_mod.AsyncOpenAI()
+            self.client = self._instructor_mod.from_openai(self.raw_client)
         elif provider == "gemini":
+            if LLMService._genai_mod is None:
+                import google.generativeai as genai
+                LLMService._genai_mod = genai
+            genai = self._genai_mod
             if api_key:
                 genai.configure(api_key=api_key)
                 self.client = genai.GenerativeModel(self.model)
             else:
                 # If no API key provided, try to get from environment
-                import os
                 gemini_api_key = os.getenv("GEMINI_API_KEY")
                 if gemini_api_key:
                     genai.configure(api_key=gemini_api_key)
@@ -48,15 +226,22 @@ class LLMService:
         else:
             raise ValueError(f"Unsupported provider: {provider}")
     
+    @cached_completion(maxsize=4096)
     async def get_completion(
         self,
         prompt: str,
         response_format: Optional[Type[BaseModel]] = None,
         max_tokens: int = 1000,
-        temperature: float = 0.1
+        temperature: float = 0.1,
+        response_adapter: Optional[TypeAdapter] = None,
+        *,
+        semantic_cache: bool = False
     ) -> Any:
         """
-        Get completion from LLM with optional structured output
+        Get completion from LLM with optional structured output.
+        A prebuilt response_adapter for response_format skips building one per call.
+        semantic_cache lets a near-duplicate cached prompt answer this one; it is
+        handled by the cache decorator.
         """
         try:
             if self.provider == "openai":
@@ -72,7 +257,7 @@ class LLMService:
                     return response
                 else:
                     # Regular completion
-                    response = await self.client.chat.completions.create(
+                    response = await self.raw_client.chat.completions.create(
                         model=self.model,
                         messages=[{"role": "user", "content": prompt}],
                         max_tokens=max_tokens,
@@ -83,13 +268,12 @@ class LLMService:
                 # Prepare the prompt for Gemini
                 if response_format:
                     # For structured output with Gemini, we need to include format instructions in the prompt
-                    import json
                     schema = self._generate_json_schema(response_format)
-                    formatted_prompt = f"{prompt}\n\nPlease respond in JSON format with the following structure:\n{json.dumps(schema, indent=2)}\n\nRespond with only the JSON object, no additional text."
+                    formatted_prompt = prompt + _json_instructions_for(response_format)
                     
-                    response = self.client.generate_content(
+                    response = await self.client.generate_content_async(
                         formatted_prompt,
-                        generation_config=genai.GenerationConfig(
+                        generation_config=self._genai_mod.GenerationConfig(
                             response_mime_type="application/json",
                             response_schema=schema,
                             max_output_tokens=max_tokens,
@@ -97,20 +281,15 @@ class LLMService:
                         )
                     )
                     
-                    # Parse the JSON response
-                    response_text = response.text.strip()
-                    # Remove any markdown code block markers
-                    if response_text.startswith('```json'):
-                        response_text = response_text[7:-3].strip()
-                    elif response_text.startswith('```'):
-                        response_text = response_text[3:-3].strip()
+                    # Parse the JSON response, removing any markdown code block markers
+                    response_text = response.text.strip().removeprefix('```json').removeprefix('```').removesuffix('```').strip()
                     
-                    parsed_response = json.loads(response_text)
-                    return response_format(**parsed_response)
+                    adapter = response_adapter or _adapter_for(response_format)
+                    return adapter.validate_json(response_text)
                 else:
-                    response = self.client.generate_content(
+                    response = await self.client.generate_content_async(
                         prompt,
-                        generation_config=genai.GenerationConfig(
+                        generation_config=self._genai_mod.GenerationConfig(
                             max_output_tokens=max_tokens,
                             temperature=temperature
                         )
@@ -120,12 +299,60 @@ class LLMService:
             print(f"Error calling LLM: {e}")
             raise
 
+    def evict_completion(
+        self,
+        prompt: str,
+        response_format: Optional[Type[BaseModel]] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.1
+    ):
+        """
+        Drop a cached completion so the same request asks the model again
+        """
+        LLMService.get_completion.cache_evict(self, prompt, response_format, max_tokens, temperature)
+
+    async def get_completion_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.1,
+        json_mode: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        Stream a plain completion as text deltas.
+        With json_mode the model is asked to reply with a bare JSON object.
+        """
+        if self.provider == "openai":
+            extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+            stream = await self.raw_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                **extra
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        elif self.provider == "gemini":
+            response = await self.client.generate_content_async(
+                prompt,
+                generation_config=self._genai_mod.GenerationConfig(
+                    response_mime_type="application/json" if json_mode else None,
+                    max_output_tokens=max_tokens,
+                    temperature=temperature
+                ),
+                stream=True
+            )
+            async for chunk in response:
+                yield chunk.text
+    
     def _generate_json_schema(self, model: Type[BaseModel]) -> dict:
         """
         Generate JSON schema for the given Pydantic model
         """
-        schema = model.model_json_schema()
-        return schema
+        return _schema_for(model)
 
 
 # Example structured response models
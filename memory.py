@@ -1,8 +1,20 @@
-from typing import List, Dict, Any
-from pydantic import BaseModel, Field
+from typing import List, Dict, Any, ClassVar, Deque, Set
+from pydantic import BaseModel, Field, PrivateAttr
 import json
 import asyncio
+import secrets
 from datetime import datetime
+from collections import Counter, deque
+from itertools import count, islice
+import numpy as np
+
+# sentence_transformers (and torch with it) is imported only when a
+# LongTermMemory is configured with an embedding_model
+try:
+    import faiss
+    VECTOR_SEARCH_AVAILABLE = True
+except ImportError:
+    VECTOR_SEARCH_AVAILABLE = False
 
 
 class MemoryItem(BaseModel):
@@ -15,8 +27,7 @@ class MemoryItem(BaseModel):
 
 
 class ShortTermMemory(BaseModel):
-    """Short-term memory for current session"""
-    history: List[MemoryItem] = Field(default_factory=list)
+    """Short-term memory for current session; its history lives on AgentMemory"""
     context: Dict[str, Any] = Field(default_factory=dict)
     max_items: int = 50
 
@@ -24,35 +35,111 @@ class ShortTermMemory(BaseModel):
 class LongTermMemory(BaseModel):
     """Long-term memory using vector storage"""
     memories: List[MemoryItem] = Field(default_factory=list)
-    embedding_model: str | None = None
+    embedding_model: str | None = None  # e.g. "sentence-transformers/all-MiniLM-L6-v2"
+    
+    # Row i of the vector index is memories[i]
+    _encoder: Any = PrivateAttr(default=None)
+    _index: Any = PrivateAttr(default=None)
+    # Results for repeated identical queries, dropped on every write
+    _query_cache: Dict[tuple, List[MemoryItem]] = PrivateAttr(default_factory=dict)
+    # Importance of memories[i] at row i, in a buffer grown in chunks
+    _importance: "np.ndarray" = PrivateAttr(default_factory=lambda: np.empty(0, dtype=np.float32))
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)
+    # Casefolded memories[i].content at row i, for the keyword search fallback
+    _contents_lower: List[str] = PrivateAttr(default_factory=list)
+    
+    IMPORTANCE_CHUNK: ClassVar[int] = 1024
+    
+    def model_post_init(self, __context: Any):
+        """Build the importance buffer and, when configured, the vector index"""
+        for row, memory in enumerate(self.memories):
+            self._append_row(row, memory)
+        
+        if self.embedding_model and VECTOR_SEARCH_AVAILABLE:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                return
+            self._encoder = SentenceTransformer(self.embedding_model)
+            self._index = faiss.IndexHNSWFlat(self._encoder.get_sentence_embedding_dimension(), 32)
+            if self.memories:
+                self._index.add(self._encode([memory.content for memory in self.memories]))
+    
+    def _append_row(self, row: int, item: MemoryItem):
+        """Record a new memory's importance, id lookup and search text"""
+        if row == len(self._importance):
+            grown = np.empty(row + self.IMPORTANCE_CHUNK, dtype=np.float32)
+            grown[:row] = self._importance
+            self._importance = grown
+        self._importance[row] = item.importance
+        self._rows.setdefault(item.id, row)
+        self._contents_lower.append(item.content.casefold())
+    
+    def _encode(self, texts: List[str]) -> "np.ndarray":
+        """Unit-length float32 embeddings, so L2 ranking matches cosine ranking"""
+        vectors = self._encoder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32)
     
     async def save_memory(self, item: MemoryItem):
         """Save a memory item to long-term storage"""
-        # In a real implementation, this would store in a vector database
-        # For now, we'll just keep it in memory
+        # Encoding is CPU-bound, so it runs off the event loop; it finishes
+        # before the append so index rows stay aligned with interleaved saves
+        vector = None
+        if self._index is not None:
+            vector = await asyncio.to_thread(self._encode, [item.content])
         self.memories.append(item)
+        self._append_row(len(self.memories) - 1, item)
+        if vector is not None:
+            self._index.add(vector)
+        self._query_cache.clear()
     
     async def search_memories(self, query: str, top_k: int = 5) -> List[MemoryItem]:
         """Search for relevant memories based on query"""
-        # In a real implementation, this would use vector similarity search
-        # For now, we'll do a simple keyword search
-        results = []
-        query_lower = query.lower()
+        cache_key = (query, top_k)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        if self._index is not None:
+            # Over-fetch nearest neighbours so the importance re-rank has a choice
+            k = min(len(self.memories), top_k * 4)
+            candidates = np.empty(0, dtype=np.int64)
+            if k:
+                _, ids = self._index.search(await asyncio.to_thread(self._encode, [query]), k)
+                candidates = ids[0][ids[0] >= 0]
+        else:
+            # Without an embedding model, fall back to a simple keyword search
+            query_lower = query.casefold()
+            candidates = np.fromiter(
+                (row for row, content in enumerate(self._contents_lower) if query_lower in content),
+                dtype=np.int64
+            )
         
-        for memory in self.memories:
-            if query_lower in memory.content.lower():
-                results.append(memory)
+        # Rank by importance and return top_k, building items only for those rows
+        importance = self._importance[candidates]
+        if len(candidates) > top_k:
+            # argpartition picks arbitrarily among ties at the cut, so take
+            # everything above it and then the earliest tied candidates
+            cutoff = importance[np.argpartition(-importance, top_k - 1)[top_k - 1]]
+            above = np.flatnonzero(importance > cutoff)
+            tied = np.flatnonzero(importance == cutoff)[:top_k - len(above)]
+            top = np.sort(np.concatenate((above, tied)))
+        else:
+            top = np.arange(len(candidates))
+        # Stable over candidate order, so equal importances keep insertion order
+        top = top[np.argsort(-importance[top], kind="stable")]
         
-        # Sort by importance and return top_k
-        results.sort(key=lambda x: x.importance, reverse=True)
-        return results[:top_k]
+        results = [self.memories[row] for row in candidates[top]]
+        self._query_cache[cache_key] = results
+        return list(results)
     
     async def update_memory_importance(self, memory_id: str, importance: float):
         """Update the importance of a memory item"""
-        for memory in self.memories:
-            if memory.id == memory_id:
-                memory.importance = importance
-                break
+        row = self._rows.get(memory_id)
+        if row is not None:
+            self.memories[row].importance = importance
+            self._importance[row] = importance
+            self._query_cache.clear()
 
 
 class AgentMemory:
@@ -60,14 +147,28 @@ class AgentMemory:
     def __init__(self, short_term_max_items: int = 50, embedding_model: str | None = None):
         self.short_term = ShortTermMemory(max_items=short_term_max_items)
         self.long_term = LongTermMemory(embedding_model=embedding_model)
+        # Bounded ring buffer: appending past max_items drops the oldest item
+        self._history: Deque[MemoryItem] = deque(maxlen=short_term_max_items)
+        # How often each task was saved, maintained on write for get_common_tasks
+        self._task_counter: Counter = Counter()
+        # Long-term saves queued off the caller's critical path, drained by close()
+        self._background_tasks: Set[asyncio.Task] = set()
+        # Memory ids are "<random per-instance prefix>-<sequence number>"
+        self._instance_prefix = secrets.token_hex(4)
+        self._id_counter = count()
+    
+    @property
+    def history(self) -> Deque[MemoryItem]:
+        """Short-term history, oldest first"""
+        return self._history
+    
+    def _next_id(self) -> str:
+        """Unique id for a memory created by this manager"""
+        return f"{self._instance_prefix}-{next(self._id_counter)}"
     
     def add_to_short_term(self, item: MemoryItem):
         """Add item to short-term memory"""
-        self.short_term.history.append(item)
-        
-        # Keep memory size manageable
-        if len(self.short_term.history) > self.short_term.max_items:
-            self.short_term.history.pop(0)  # Remove oldest item
+        self._history.append(item)
     
     async def add_to_long_term(self, item: MemoryItem):
         """Add item to long-term memory"""
@@ -83,7 +184,7 @@ class AgentMemory:
     
     def get_recent_history(self, count: int = 10) -> List[MemoryItem]:
         """Get recent history from short-term memory"""
-        return self.short_term.history[-count:]
+        return list(islice(self._history, max(0, len(self._history) - count), None))
     
     async def search_long_term(self, query: str, top_k: int = 5) -> List[MemoryItem]:
         """Search long-term memory"""
@@ -97,10 +198,9 @@ class AgentMemory:
         importance: float = 0.5
     ):
         """Save an interaction to long-term memory"""
-        import uuid
-        
-        memory_item = MemoryItem(
-            id=str(uuid.uuid4()),
+        # Fields are built here from known types, so skip validation
+        memory_item = MemoryItem.model_construct(
+            id=self._next_id(),
             timestamp=datetime.now(),
             content=f"User: {user_input}\nAgent: {agent_response}\nPage: {page_state}",
             metadata={
@@ -121,10 +221,9 @@ class AgentMemory:
         importance: float = 0.8
     ):
         """Save a task result to long-term memory"""
-        import uuid
-        
-        memory_item = MemoryItem(
-            id=str(uuid.uuid4()),
+        # Fields are built here from known types, so skip validation
+        memory_item = MemoryItem.model_construct(
+            id=self._next_id(),
             timestamp=datetime.now(),
             content=f"Task: {task}\nResult: {result}\nSuccess: {success}",
             metadata={
@@ -136,6 +235,27 @@ class AgentMemory:
         )
         
         await self.add_to_long_term(memory_item)
+        self._task_counter[task] += 1
+    
+    def queue_long_term_save(
+        self,
+        task: str,
+        result: str,
+        success: bool,
+        importance: float = 0.8
+    ) -> asyncio.Task:
+        """Save a task result to long-term memory in the background"""
+        background = asyncio.create_task(
+            self.save_task_result_to_long_term(task, result, success, importance)
+        )
+        self._background_tasks.add(background)
+        background.add_done_callback(self._background_tasks.discard)
+        return background
+    
+    async def close(self):
+        """Wait for queued long-term saves to finish"""
+        while self._background_tasks:
+            await asyncio.gather(*self._background_tasks)
     
     async def get_user_preferences(self) -> Dict[str, Any]:
         """Retrieve user preferences from long-term memory"""
@@ -152,15 +272,8 @@ class AgentMemory:
         return preferences
     
     async def get_common_tasks(self) -> List[str]:
-        """Retrieve commonly performed tasks from long-term memory"""
-        task_memories = await self.search_long_term("task", top_k=20)
-        
-        tasks = []
-        for memory in task_memories:
-            if "task" in memory.metadata:
-                tasks.append(memory.metadata["task"])
-        
-        return list(set(tasks))  # Return unique tasks
+        """Retrieve commonly performed tasks, most frequent first"""
+        return [task for task, _ in self._task_counter.most_common(20)]
 
 
 # Example usage:
@@ -1,23 +1,158 @@
 import asyncio
-from typing import Dict, Any, Callable
-from pydantic import BaseModel, Field
+import concurrent.futures
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import types
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Awaitable, Callable, Iterator, Mapping, Tuple
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 import getpass
 
+_log = logging.getLogger('webagent.security')
+
+# Replies accepted as approval in request_confirmation
+_YES = frozenset({'y', 'yes', 'true', '1', 'ok'})
+
+# Shared read-only stand-in for omitted details
+_EMPTY: Mapping[str, Any] = types.MappingProxyType({})
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+
+try:
+    import termios
+    TERMIOS_AVAILABLE = True
+except ImportError:
+    TERMIOS_AVAILABLE = False
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import numpy as np
+    from numba import njit
+    from numba.typed import List as TypedList
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, boundscheck=False)
+    def _scan_sensitive(buf, needles):
+        """Whether any needle occurs in buf; all are lowercase UTF-8 byte arrays"""
+        n = buf.shape[0]
+        for needle in needles:
+            m = needle.shape[0]
+            for start in range(n - m + 1):
+                j = 0
+                while j < m and buf[start + j] == needle[j]:
+                    j += 1
+                if j == m:
+                    return True
+        return False
+
+
+@functools.cache
+def _sensitive_matchers(sensitive_actions: Tuple[str, ...]) -> tuple:
+    """
+    Matchers for a set of sensitive actions, built once per distinct tuple:
+    interned lowercase word set, case-insensitive regex, and the optional
+    Aho-Corasick automaton and numba needles (None when unavailable)
+    """
+    tokens = frozenset(sys.intern(sensitive.lower()) for sensitive in sensitive_actions)
+    pattern = re.compile(
+        "|".join(re.escape(sensitive) for sensitive in sensitive_actions) or "(?!)",
+        re.IGNORECASE
+    )
+    automaton = None
+    if AHOCORASICK_AVAILABLE and sensitive_actions:
+        automaton = ahocorasick.Automaton()
+        for sensitive in sensitive_actions:
+            automaton.add_word(sensitive.lower(), True)
+        automaton.make_automaton()
+    needles = None
+    if NUMBA_AVAILABLE and sensitive_actions:
+        needles = TypedList(
+            np.frombuffer(sensitive.lower().encode(), dtype=np.uint8) for sensitive in sensitive_actions
+        )
+    return tokens, pattern, automaton, needles
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify(action: str, sensitive_actions: Tuple[str, ...]) -> bool:
+    """Whether action mentions any of sensitive_actions, ignoring case"""
+    tokens, pattern, automaton, needles = _sensitive_matchers(sensitive_actions)
+    lowered = action.lower()
+    # Whole-word hits are a set lookup; only then scan for substrings
+    if not tokens.isdisjoint(lowered.split()):
+        return True
+    if automaton is not None:
+        # Single pass over the action for all patterns, stopping at the first match
+        return next(automaton.iter(lowered), None) is not None
+    if needles is not None:
+        return _scan_sensitive(np.frombuffer(lowered.encode(), dtype=np.uint8), needles)
+    return pattern.search(action) is not None
+
 
 class SecurityConfig(BaseModel):
     """Configuration for security features"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     enable_hitl: bool = True
     max_retries: int = 3
     timeout_seconds: int = 30
-    sensitive_actions: list = Field(default_factory=list)  # Actions that require confirmation
+    history_size: int = 10000  # Most recent checked actions kept by SecurityManager
+    sensitive_actions: Tuple[str, ...] = (  # Actions that require confirmation
+        "payment", "purchase", "checkout", "login",
+        "delete", "remove", "cancel", "2fa", "captcha"
+    )
     
-    def __init__(self, **data):
-        super().__init__(**data)
-        if not self.sensitive_actions:
-            self.sensitive_actions = [
-                "payment", "purchase", "checkout", "login",
-                "delete", "remove", "cancel", "2fa", "captcha"
-            ]
+    @classmethod
+    def fast(cls, **data) -> "SecurityConfig":
+        """Build a config from known-good values without validating them"""
+        return cls.model_construct(**data)
+    
+    @classmethod
+    def validated(cls, **data) -> "SecurityConfig":
+        """Build a config from untrusted values through the prebuilt validator"""
+        return _ADAPTER.validate_python(data)
+
+
+# Validator for SecurityConfig, built once at import
+_ADAPTER = TypeAdapter(SecurityConfig)
+
+
+def _terminal_state() -> tuple | None:
+    """The attributes of the controlling terminal on stdin, or None if there is none"""
+    if not (TERMIOS_AVAILABLE and sys.stdin.isatty()):
+        return None
+    fd = sys.stdin.fileno()
+    return fd, termios.tcgetattr(fd)
+
+
+def _restore_terminal(saved: tuple | None):
+    """Put back attributes captured by _terminal_state, e.g. echo after an abandoned getpass"""
+    if saved is not None:
+        termios.tcsetattr(saved[0], termios.TCSADRAIN, saved[1])
 
 
 class HumanInTheLoop:
@@ -26,87 +161,136 @@ class HumanInTheLoop:
     def __init__(self, config: SecurityConfig):
         self.config = config
         self.pending_confirmation = {}
+        # The config is frozen, so settings read on every call are copied to plain attributes
+        self._hitl_enabled = bool(config.enable_hitl)
+        self.max_retries = config.max_retries
+        self.timeout_seconds = config.timeout_seconds
+        self._sensitive_actions = tuple(config.sensitive_actions)
+        # One thread owns the terminal, so prompts never queue behind unrelated executor work
+        self._input_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="hitl-input"
+        )
+        # A line read abandoned on timeout, still blocking the input thread
+        self._pending_input: concurrent.futures.Future | None = None
     
     async def request_confirmation(
         self,
         action: str,
-        details: Dict[str, Any],
+        details: Mapping[str, Any],
         timeout: int | None = None
     ) -> bool:
         """
         Request human confirmation for sensitive actions
         """
         if timeout is None:
-            timeout = self.config.timeout_seconds
+            timeout = self.timeout_seconds
             
-        print(f"\n⚠️  SECURITY ALERT: Action requires confirmation")
-        print(f"Action: {action}")
-        print(f"Details: {details}")
+        # The prompt is for the person at the terminal, so it bypasses logging
+        sys.stdout.write(f"\n⚠️  SECURITY ALERT: Action requires confirmation\nAction: {action}\nDetails: {dict(details)}\n")
         
+        confirmation = await self._prompt(
+            "Allow this action? (y/n): ", timeout, "⏰ Timeout: No response within %s seconds"
+        )
+        return confirmation is not None and confirmation.lower() in _YES
+    
+    async def _prompt(self, prompt: str, timeout: int, timeout_message: str, secret: bool = False) -> str | None:
+        """
+        Read one stripped line of user input within timeout seconds, without echo if secret.
+        On timeout, log timeout_message (formatted with the timeout) and return None.
+        """
+        read = self._get_secret_async if secret else self._get_user_input_async
         try:
-            # Use asyncio.wait_for to implement timeout
-            confirmation = await asyncio.wait_for(
-                self._get_user_input_async(f"Allow this action? (y/n): "),
-                timeout=timeout
-            )
-            return confirmation.lower() in ['y', 'yes', 'true', '1']
+            reply = await asyncio.wait_for(read(prompt), timeout=timeout)
         except asyncio.TimeoutError:
-            print(f"\n⏰ Timeout: No response within {timeout} seconds")
-            return False
+            _log.warning(timeout_message, timeout)
+            return None
+        return reply.strip()
     
     async def _get_user_input_async(self, prompt: str) -> str:
-        """Get user input asynchronously"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, input, prompt)
+        """
+        Get user input asynchronously.
+        A read abandoned on timeout keeps the input thread waiting for a line,
+        so the next prompt takes that read over instead of queueing behind it;
+        the line typed then answers the prompt on screen.
+        """
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        read = self._pending_input
+        if read is None or read.done():
+            # A line that arrived after its prompt timed out is stale
+            read = self._input_executor.submit(input)
+        self._pending_input = read
+        # Shielded so a timeout leaves the read in place for the next prompt
+        line = await asyncio.shield(asyncio.wrap_future(read))
+        self._pending_input = None
+        return line
+    
+    async def _get_secret_async(self, prompt: str) -> str:
+        """
+        Get user input asynchronously without echoing it.
+        Each secret read runs on its own daemon thread, so a read abandoned on
+        timeout holds neither the input thread nor interpreter exit, and the
+        terminal's echo setting is put back when it is abandoned.
+        """
+        reply: concurrent.futures.Future = concurrent.futures.Future()
+        
+        def read():
+            if not reply.set_running_or_notify_cancel():
+                return
+            try:
+                reply.set_result(getpass.getpass(prompt))
+            except BaseException as e:
+                reply.set_exception(e)
+        
+        saved = _terminal_state()
+        threading.Thread(target=read, name="hitl-secret", daemon=True).start()
+        try:
+            return await asyncio.wrap_future(reply)
+        except asyncio.CancelledError:
+            _restore_terminal(saved)
+            raise
+    
+    async def aclose(self):
+        """Release the input thread without waiting on a pending prompt"""
+        self._input_executor.shutdown(wait=False)
     
     async def handle_2fa_request(self) -> str | None:
         """
         Handle 2FA code input from user
         """
-        print("\n🔒 Two-factor authentication required")
-        try:
-            code = await asyncio.wait_for(
-                self._get_user_input_async("Enter 2FA code: "),
-                timeout=self.config.timeout_seconds
-            )
-            return code.strip()
-        except asyncio.TimeoutError:
-            print(f"\n⏰ Timeout: 2FA code not provided within {self.config.timeout_seconds} seconds")
-            return None
+        sys.stdout.write("\n🔒 Two-factor authentication required\n")
+        return await self._prompt(
+            "Enter 2FA code: ", self.timeout_seconds, "⏰ Timeout: 2FA code not provided within %s seconds",
+            secret=True
+        )
     
-    async def handle_captcha_request(self, captcha_info: Dict[str, Any]) -> str | None:
+    async def handle_captcha_request(self, captcha_info: Mapping[str, Any]) -> str | None:
         """
         Handle CAPTCHA solving request
         """
-        print(f"\n🔒 CAPTCHA challenge detected")
-        print(f"CAPTCHA type: {captcha_info.get('type', 'unknown')}")
+        sys.stdout.write(f"\n🔒 CAPTCHA challenge detected\nCAPTCHA type: {captcha_info.get('type', 'unknown')}\n")
         
         if captcha_info.get('image_url'):
-            print(f"CAPTCHA image: {captcha_info['image_url']}")
+            sys.stdout.write(f"CAPTCHA image: {captcha_info['image_url']}\n")
         
-        try:
-            solution = await asyncio.wait_for(
-                self._get_user_input_async("Enter CAPTCHA solution: "),
-                timeout=self.config.timeout_seconds
-            )
-            return solution.strip()
-        except asyncio.TimeoutError:
-            print(f"\n⏰ Timeout: CAPTCHA not solved within {self.config.timeout_seconds} seconds")
-            return None
+        return await self._prompt(
+            "Enter CAPTCHA solution: ", self.timeout_seconds, "⏰ Timeout: CAPTCHA not solved within %s seconds"
+        )
     
     async def handle_sensitive_action(
         self,
         action: str,
-        details: Dict[str, Any]
+        details: Mapping[str, Any]
     ) -> bool:
         """
         Handle any sensitive action that requires human approval
         """
-        if not self.config.enable_hitl:
+        if not self._hitl_enabled:
             return True  # Skip confirmation if HITL is disabled
             
         # Check if action is sensitive
-        is_sensitive = any(sensitive in action.lower() for sensitive in self.config.sensitive_actions)
+        # Classification is pure and cached; the confirmation itself never is
+        is_sensitive = _classify(action, self._sensitive_actions)
         
         if is_sensitive:
             return await self.request_confirmation(action, details)
@@ -114,52 +298,60 @@ class HumanInTheLoop:
         return True
 
 
+@dataclass(slots=True, frozen=True)
+class _Credential:
+    """Stored credential with the password kept encrypted"""
+    username: str
+    password_ct: bytes
+
+
 class CredentialManager:
     """Secure credential management"""
     
     def __init__(self):
-        self._credentials = {}
+        self._credentials: Dict[str, _Credential] = {}
         self._encrypted_storage = True
+        # One AES-256-GCM key per manager, created with the first stored credential
+        self._aead = None
     
     def store_credential(self, service: str, username: str, password: str):
         """
         Store credentials securely
-        In a real implementation, this would encrypt the credentials
+        Passwords are kept in memory encrypted with AES-GCM
         """
-        # For now, just store in memory
-        # In production, use proper encryption and secure storage
-        self._credentials[service] = {
-            'username': username,
-            'password': self._encrypt_password(password)  # Simplified
-        }
+        if self._aead is None:
+            if not CRYPTOGRAPHY_AVAILABLE:
+                raise ImportError(
+                    "cryptography library is required to store credentials but not installed. "
+                    "Install it using: pip install cryptography"
+                )
+            self._aead = AESGCM(os.urandom(32))
+        self._credentials[sys.intern(service)] = _Credential(username, self._encrypt_password(password))
     
     def get_credential(self, service: str) -> Dict[str, str] | None:
         """
         Retrieve credentials for a service
         """
-        if service in self._credentials:
-            cred = self._credentials[service]
-            return {
-                'username': cred['username'],
-                'password': self._decrypt_password(cred['password'])
-            }
-        return None
+        cred = self._credentials.get(service)
+        if cred is None:
+            return None
+        return {
+            'username': cred.username,
+            'password': self._decrypt_password(cred.password_ct)
+        }
     
-    def _encrypt_password(self, password: str) -> str:
+    def _encrypt_password(self, password: str) -> bytes:
         """
-        Encrypt password (simplified for example)
-        In production, use proper encryption like AES
+        Encrypt password, returning the 12-byte nonce followed by the ciphertext
         """
-        # This is a placeholder - use proper encryption in production
-        return f"encrypted_{password}"  # Don't do this in production!
+        nonce = os.urandom(12)
+        return nonce + self._aead.encrypt(nonce, password.encode(), None)
     
-    def _decrypt_password(self, encrypted_password: str) -> str:
+    def _decrypt_password(self, encrypted_password: bytes) -> str:
         """
-        Decrypt password (simplified for example)
-        In production, use proper decryption
+        Decrypt a password produced by _encrypt_password
         """
-        # This is a placeholder - use proper decryption in production
-        return encrypted_password.replace("encrypted_", "")  # Don't do this in production!
+        return self._aead.decrypt(encrypted_password[:12], encrypted_password[12:], None).decode()
 
 
 class SecurityManager:
@@ -167,33 +359,44 @@ class SecurityManager:
     
     def __init__(self, config: SecurityConfig | None = None):
         if config is None:
-            config = SecurityConfig()
+            config = SecurityConfig.fast()
         self.config = config
+        # Compile the sensitive-action scan now rather than on the first checked action
+        _classify("", tuple(config.sensitive_actions))
         self.hitl = HumanInTheLoop(config)
         self.credential_manager = CredentialManager()
-        self.action_history = []
+        # Lowercase challenge type -> handler taking the challenge details
+        self._challenge_handlers: Dict[str, Callable[[Mapping[str, Any]], Awaitable[str | None]]] = {
+            '2fa': lambda details: self.hitl.handle_2fa_request(),
+            'captcha': self.hitl.handle_captcha_request
+        }
+        # (action, details, timestamp) per checked action, oldest dropped past history_size
+        self.action_history = deque(maxlen=config.history_size)
     
     async def check_action_allowed(
         self,
         action: str,
-        details: Dict[str, Any] | None = None
+        details: Mapping[str, Any] | None = None
     ) -> bool:
         """
         Check if an action is allowed based on security policies
         """
         if details is None:
-            details = {}
+            details = _EMPTY
         
         # Add action to history
-        self.action_history.append({
-            'action': action,
-            'details': details,
-            'timestamp': asyncio.get_event_loop().time()
-        })
+        self.action_history.append((action, details, time.monotonic()))
         
         # Handle sensitive actions
         return await self.hitl.handle_sensitive_action(action, details)
     
+    def recent_actions(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over checked actions as dicts, oldest first
+        """
+        for action, details, timestamp in self.action_history:
+            yield {'action': action, 'details': details, 'timestamp': timestamp}
+    
     async def handle_authentication_challenge(
         self,
         challenge_type: str,
@@ -202,13 +405,11 @@ class SecurityManager:
         """
         Handle various authentication challenges
         """
-        if challenge_type.lower() == '2fa':
-            return await self.hitl.handle_2fa_request()
-        elif challenge_type.lower() == 'captcha':
-            return await self.hitl.handle_captcha_request(challenge_details or {})
-        else:
-            print(f"Unknown challenge type: {challenge_type}")
+        handler = self._challenge_handlers.get(challenge_type.lower())
+        if handler is None:
+            _log.warning("Unknown challenge type: %s", challenge_type)
             return None
+        return await handler(challenge_details or _EMPTY)
     
     def store_credentials(self, service: str, username: str, password: str):
         """
@@ -226,8 +427,7 @@ class SecurityManager:
         """
         Log security-related events
         """
-        print(f"🔒 Security Event: {event_type}")
-        print(f"Details: {details}")
+        _log.info("🔒 Security Event: %s Details: %s", event_type, details)
         
         # In production, log to secure logging system
         # This is where you'd integrate with your logging infrastructure
@@ -252,4 +452,6 @@ async def example_usage():
 
 
 if __name__ == "__main__":
-    asyncio.run(example_usage())
\ No newline at end of file
+    # uvloop where installed (not on Windows); only the script entrypoint picks the loop
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop if UVLOOP_AVAILABLE else None) as runner:
+        runner.run(example_usage())
\ No newline at end of file
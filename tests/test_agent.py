@@ -0,0 +1,210 @@
+import asyncio
+import math
+
+import pytest
+
+pytest.importorskip("browser_use")
+
+from browser_agent import browser_use_adapter
+from browser_agent.agent import (
+    ActionModel,
+    ActionResult,
+    AgentHistory,
+    Plan,
+    PlanAndExecuteAgent,
+    PlanStep,
+    RingHistory,
+    _lower_action,
+)
+
+
+def step(action, depends_on=None, **parameters):
+    return PlanStep(
+        action=ActionModel(action=action, parameters=parameters),
+        description=action,
+        depends_on=depends_on
+    )
+
+
+class FakeBrowserService:
+    """Records browser calls; click_element raises for ids listed in failing"""
+
+    def __init__(self, **kwargs):
+        self.calls = []
+        self.failing = set()
+
+    async def create_session(self):
+        pass
+
+    async def new_context(self):
+        pass
+
+    async def close_context(self):
+        pass
+
+    async def get_current_page_state(self):
+        return None
+
+    async def click_element(self, element_id):
+        self.calls.append(("click", element_id))
+        if element_id in self.failing:
+            self.failing.discard(element_id)
+            raise TimeoutError("timed out")
+
+    async def type_text(self, element_id, text):
+        self.calls.append(("type", element_id, text))
+
+    async def scroll_page(self, direction):
+        self.calls.append(("scroll", direction))
+
+    async def go_to_url(self, url):
+        self.calls.append(("goto", url))
+
+
+class FixedPlanAgent(PlanAndExecuteAgent):
+    """Runs a given plan instead of asking the LLM for one"""
+
+    def __init__(self, plan):
+        super().__init__(llm_service=None)
+        self.plan = plan
+
+    async def _create_plan(self, task):
+        return self.plan
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    monkeypatch.setattr(browser_use_adapter, "BrowserService", FakeBrowserService)
+    return FixedPlanAgent
+
+
+def history_entries(history):
+    return [(entry.action.action, entry.success, entry.result) for entry in history]
+
+
+def test_schedule_keeps_plan_order_without_dependencies(make_agent):
+    plan = Plan(steps=[step("goto", url="u"), step("wait"), step("click", element_id="b")])
+    assert make_agent(plan)._schedule_plan(plan) == [0, 1, 2]
+
+
+def test_schedule_runs_steps_after_their_dependencies(make_agent):
+    plan = Plan(steps=[
+        step("click", [2], element_id="b"),
+        step("wait", []),
+        step("goto", [], url="u"),
+    ])
+    assert make_agent(plan)._schedule_plan(plan) == [1, 2, 0]
+
+
+def test_schedule_falls_back_to_plan_order_on_cycles(make_agent):
+    plan = Plan(steps=[step("click", [1], element_id="a"), step("click", [0], element_id="b")])
+    assert make_agent(plan)._schedule_plan(plan) == [0, 1]
+
+
+def test_lowered_plan_awaits_browser_calls_in_order(make_agent):
+    url = "https://example.com/?q='\"\\"
+    agent = make_agent(Plan(steps=[
+        step("goto", url=url),
+        step("type", element_id="q", text="it's"),
+        step("wait", seconds=0),
+        step("click", element_id="b"),
+        step("stop"),
+    ]))
+
+    output = asyncio.run(agent.run_task("task"))
+
+    assert output.success
+    assert agent.browser.browser_service.calls == [
+        ("goto", url),
+        ("type", "q", "it's"),
+        ("click", "b"),
+    ]
+    assert history_entries(agent.history) == [
+        ("goto", True, f"Navigated to {url}"),
+        ("type", True, "Typed 'it's' into element q"),
+        ("wait", True, "Waited for 0 seconds"),
+        ("click", True, "Clicked element b"),
+        ("stop", True, "Stop action received"),
+    ]
+
+
+def test_lowered_step_that_raises_is_recorded_not_replayed(make_agent, monkeypatch):
+    agent = make_agent(Plan(steps=[step("goto", url="u"), step("click", element_id="buy")]))
+    agent.browser.browser_service.failing.add("buy")
+
+    async def give_up(step, result, current_state):
+        return ActionResult.model_construct(action=step.action, success=False, result=result.result)
+
+    monkeypatch.setattr(agent, "_handle_error", give_up, raising=False)
+    output = asyncio.run(agent.run_task("task"))
+
+    assert not output.success
+    assert agent.browser.browser_service.calls == [("goto", "u"), ("click", "buy")]
+    assert history_entries(agent.history) == [
+        ("goto", True, "Navigated to u"),
+        ("click", False, "Error executing action click: timed out"),
+    ]
+
+
+@pytest.mark.parametrize("seconds", [math.nan, math.inf, -math.inf, True, "1"])
+def test_wait_with_unusable_duration_is_not_lowered(seconds):
+    assert _lower_action(ActionModel(action="wait", parameters={"seconds": seconds})) is None
+
+
+def test_plan_with_non_finite_wait_fails_that_step(make_agent, monkeypatch):
+    agent = make_agent(Plan(steps=[step("goto", url="u"), step("wait", seconds=math.nan)]))
+
+    async def give_up(step, result, current_state):
+        return ActionResult.model_construct(action=step.action, success=False, result=result.result)
+
+    monkeypatch.setattr(agent, "_handle_error", give_up, raising=False)
+    output = asyncio.run(agent.run_task("task"))
+
+    assert not output.success
+    assert history_entries(agent.history) == [
+        ("goto", True, "Navigated to u"),
+        ("wait", False, "Invalid seconds parameter for wait action"),
+    ]
+
+
+def test_ring_history_overwrites_oldest_step():
+    history = RingHistory(2)
+    for n in range(3):
+        history.record(ActionModel(action="click", parameters={"element_id": str(n)}), True, str(n))
+
+    assert len(history) == 2
+    assert [entry["result"] for entry in history.dump()] == ["1", "2"]
+    assert [entry.result for entry in history] == ["1", "2"]
+
+
+def test_ring_history_reserve_keeps_recorded_steps():
+    history = RingHistory(2)
+    for n in range(2):
+        history.record(ActionModel(action="wait"), n == 0, str(n))
+
+    history.reserve(4)
+    for n in range(2, 4):
+        history.record(ActionModel(action="wait"), True, str(n))
+
+    assert history.max_steps == 4
+    assert [(entry["success"], entry["result"]) for entry in history.dump()] == [
+        (True, "0"), (False, "1"), (True, "2"), (True, "3"),
+    ]
+
+
+def test_plan_longer_than_max_steps_keeps_every_step(make_agent):
+    agent = make_agent(Plan(steps=[step("wait", [], seconds=0), step("click", element_id="b")] * 30))
+
+    asyncio.run(agent.run_task("task"))
+
+    assert len(agent.history) == 60
+
+
+def test_agent_output_serializes_recorded_steps(make_agent):
+    agent = make_agent(Plan(steps=[step("goto", url="u"), step("click", element_id="b")]))
+
+    output = asyncio.run(agent.run_task("task"))
+
+    dumped = output.model_dump()["history"]
+    assert dumped == agent.history.model_dump()
+    assert dumped != AgentHistory().model_dump()